@@ -0,0 +1,35 @@
+"""
+Shared JSON codec for the agent package. Uses orjson — a C
+implementation, typically 2-5x faster than stdlib json on the payload
+sizes this project handles — when installed, falling back transparently
+to the stdlib. Import from here instead of repeating the try/except
+shim per module.
+"""
+import json
+
+try:
+    import orjson
+
+    def _json_loads(data):
+        """Parse JSON from str or bytes"""
+        return orjson.loads(data)
+
+    def _json_dumps(obj, default=None) -> str:
+        """Serialize to a JSON string"""
+        return orjson.dumps(obj, default=default).decode()
+
+    def _json_dumps_bytes(obj, default=None) -> bytes:
+        """Serialize to UTF-8 JSON bytes (e.g. for sqlite blobs)"""
+        return orjson.dumps(obj, default=default)
+except ImportError:
+    def _json_loads(data):
+        """Parse JSON from str or bytes"""
+        return json.loads(data)
+
+    def _json_dumps(obj, default=None) -> str:
+        """Serialize to a JSON string"""
+        return json.dumps(obj, default=default)
+
+    def _json_dumps_bytes(obj, default=None) -> bytes:
+        """Serialize to UTF-8 JSON bytes (e.g. for sqlite blobs)"""
+        return json.dumps(obj, default=default).encode()
@@ -1,64 +1,405 @@
+import asyncio
+import copy
+import hashlib
+import io
 import logging
+import weakref
+from collections import OrderedDict, deque
 import time
-import json
 import re
-from typing import Dict, Any, List, Optional
-from openai import OpenAI
-from config.settings import OPENAI_API_KEY
+from typing import Dict, Any, List, Optional, Union
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from pydantic import BaseModel, Field
+from config.settings import OPENAI_API_KEY, PREFS_DB_PATH
+from agent._json import _json_loads, _json_dumps
+from agent.pref_store import PrefStore
+from agent.query_parser import QueryParser
+
+# NumPy collapses the per-field aggregation passes in suggest_refinements
+# into single C-level reductions; pure-Python fallback when not installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 logger = logging.getLogger(__name__)
 
+# Process-wide OpenAI clients sharing one keep-alive connection pool, so
+# per-request AgentFramework instances don't each renegotiate TLS. HTTP/2
+# lets the async variants multiplex concurrent calls over one connection.
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32)
+try:
+    _HTTP_CLIENT = httpx.Client(http2=True, limits=_HTTP_LIMITS)
+    _HTTP2 = True
+except ImportError:
+    # httpx needs its optional h2 extra for HTTP/2; the keep-alive pool
+    # still applies over HTTP/1.1
+    _HTTP_CLIENT = httpx.Client(limits=_HTTP_LIMITS)
+    _HTTP2 = False
+# OpenAI() refuses to construct with a missing key; substitute a
+# placeholder so import succeeds and _has_llm stays the gate that keeps
+# keyless runs on the local fallbacks
+_API_KEY = OPENAI_API_KEY or "key-not-configured"
+_CLIENT = OpenAI(api_key=_API_KEY, http_client=_HTTP_CLIENT)
+
+# Async clients are created lazily, one per running event loop: pooled
+# keep-alive connections bind to the loop that opened them, and reusing
+# them after asyncio.run() closes that loop raises "event loop is
+# closed". Weak keys let a client go away with its loop.
+_ACLIENTS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _get_aclient() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client for the current running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _ACLIENTS.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=_API_KEY,
+            http_client=httpx.AsyncClient(http2=_HTTP2, limits=_HTTP_LIMITS))
+        _ACLIENTS[loop] = client
+    return client
+
+# Bound on the in-memory plan/parse LRU caches
+_CACHE_MAX = 1024
+
+# Shared regex-parser fallback, built once instead of per failed call
+_QUERY_PARSER = QueryParser()
+
+# Static prompt bodies hoisted to module level so each call only substitutes
+# the dynamic fields instead of rebuilding the full text
+_PLAN_PROMPT_TEMPLATE = """
+Create a 2-3 step plan for this shopping request: "{query}" {user_context}
+Consider these possible actions:
+1. search - Initial product search
+2. filter - Apply additional filters
+3. analyze_reviews - Analyze customer reviews
+4. compare - Compare multiple products
+5. recommend - Make a final recommendation
+
+Return JSON with steps array containing:
+- step_number: Integer
+- action: String (one of the above)
+- parameters: Object with relevant parameters
+- reasoning: String explaining why this step is needed
+"""
+
+_REVIEW_PROMPT_TEMPLATE = """
+Analyze these product reviews and extract:
+1. Overall sentiment (positive/mixed/negative)
+2. Top 3 strengths mentioned
+3. Top 3 concerns mentioned
+4. Most frequently mentioned features
+5. Reliability assessment (very reliable, reliable, questionable, unreliable)
+
+Reviews: {reviews}
+
+Return JSON with: sentiment, strengths (array), concerns (array), features (array), reliability
+"""
+
+_COMPARE_PROMPT_TEMPLATE = """
+Compare these products on price, quality, and value for a shopper. Products:
+{products}
+
+Return JSON with:
+- best_overall: ID of best overall product
+- best_value: ID of best value product
+- comparison_table: Array of feature comparisons
+- summary: Detailed analysis of strengths and weaknesses
+"""
+
+_PARSE_PROMPT_TEMPLATE = """
+Parse this shopping query into structured parameters:
+"{query}"
+
+Return JSON with:
+- product_type: Main product category
+- price_range: {{min, max}} (numbers)
+- keywords: Array of important features or requirements
+- rating_min: Minimum star rating (number)
+- prime_shipping: Boolean if Prime is requested
+- exact_rating_min: Precise rating threshold if specified
+- material: Material requirement if specified
+- origin_country: Country of origin if specified
+- excluded_terms: Terms to exclude
+"""
+
+# Common feature vocabulary by product category
+_FEATURE_WORDS = {
+    "laptop": ["ram", "processor", "ssd", "hdd", "display", "screen", "battery", "graphics"],
+    "phone": ["storage", "camera", "battery", "display", "processor", "ram"],
+    "general": ["wireless", "bluetooth", "waterproof", "portable", "digital"]
+}
+
+# One alternation lexer per category: a single finditer pass over the title
+# yields every feature word (with its leading spec value when present),
+# replacing the per-word substring check + per-word regex search
+_CATEGORY_LEXER = {
+    category: re.compile(
+        r'(\d+(?:\.\d+)?\s*(?:GB|TB|MP|GHz|inch|hours)?\s*)?(' + '|'.join(map(re.escape, words)) + r')',
+        re.IGNORECASE)
+    for category, words in _FEATURE_WORDS.items()
+}
+
+_COMPARE_PATTERNS = {
+    keyword: re.compile(rf'(\d+(?:\.\d+)?\s*(?:GB|TB|GHz|inch|hours|lbs)?\s*{keyword})', re.IGNORECASE)
+    for keyword in ["RAM", "processor", "CPU", "battery", "display", "weight", "storage", "SSD", "resolution"]
+}
+
+# Token count drives both latency and cost, so review text and titles are
+# condensed before they are interpolated into prompts
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_TITLE_BOILERPLATE_RE = re.compile(
+    r"\s*(?:amazon's choice|best seller|limited time deal|sponsored|"
+    r"\(renewed\)|\(refurbished\))\s*",
+    re.IGNORECASE)
+
+
+def _condense_reviews(text: Union[str, bytes], max_chars: int = 1500) -> str:
+    """
+    Drop duplicate review sentences and cap the total length. Near-identical
+    sentences are detected by hashing their lowercased form, which roughly
+    halves input tokens on typical review pages without losing information.
+    Accepts raw bytes; large transcripts are truncated to a generous prefix
+    before the sentence split so work stays bounded regardless of input size.
+    """
+    # Even with heavy duplication the kept sentences come from well inside
+    # this prefix, so anything beyond it would be split and then discarded
+    bound = max_chars * 8
+    if isinstance(text, (bytes, bytearray, memoryview)):
+        text = bytes(memoryview(text)[:bound]).decode("utf-8", "ignore")
+    elif len(text) > bound:
+        text = text[:bound]
+
+    seen = set()
+    kept = []
+    total = 0
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        digest = hashlib.blake2b(sentence.lower().encode("utf-8"), digest_size=8).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        if total + len(sentence) > max_chars:
+            break
+        kept.append(sentence)
+        total += len(sentence) + 1
+    return " ".join(kept)
+
+
+def _strip_title_boilerplate(title: str) -> str:
+    """Remove marketing phrases that add tokens but no product information"""
+    return _TITLE_BOILERPLATE_RE.sub(" ", title).strip()
+
+
+def _encode_products(product_data: List[Dict]) -> str:
+    """
+    JSON-encode the fixed-schema comparison payload by emitting its known
+    keys directly. Only the string-valued fields go through the generic
+    encoder, skipping per-entry type dispatch and key serialization.
+    """
+    parts = []
+    for p in product_data:
+        parts.append('{"id":%d,"title":%s,"price":%s,"rating":%s,"features":%s,"prime":%s}' % (
+            p["id"],
+            _json_dumps(p["title"]),
+            _json_dumps(p["price"]),
+            _json_dumps(p["rating"]),
+            _json_dumps(p["features"]),
+            "true" if p["prime"] else "false"))
+    return "[" + ",".join(parts) + "]"
+
+
+def _field_stats(products: List[Dict], field: str) -> Optional[tuple]:
+    """
+    (mean, min, max) over the positive values of a numeric product field,
+    computed in one vectorized pass when NumPy is available.
+    Returns None when no product has a positive value.
+    """
+    if np is not None:
+        arr = np.fromiter((p.get(field, 0) or 0 for p in products),
+                          dtype=np.float64, count=len(products))
+        arr = arr[arr > 0]
+        if arr.size == 0:
+            return None
+        return float(arr.mean()), float(arr.min()), float(arr.max())
+
+    values = [v for v in (p.get(field, 0) for p in products) if v and v > 0]
+    if not values:
+        return None
+    return sum(values) / len(values), min(values), max(values)
+
+
+# Structured-output schemas: the API enforces these shapes server-side so
+# the plan and parse paths never see malformed JSON
+class PlanStep(BaseModel):
+    step_number: int
+    action: str
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+    reasoning: str = ""
+
+
+class Plan(BaseModel):
+    steps: List[PlanStep] = Field(default_factory=list)
+
+
+class PriceRange(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+class ParsedQuery(BaseModel):
+    product_type: Optional[str] = None
+    price_range: PriceRange = Field(default_factory=PriceRange)
+    keywords: List[str] = Field(default_factory=list)
+    rating_min: Optional[float] = None
+    prime_shipping: bool = False
+    exact_rating_min: Optional[float] = None
+    material: Optional[str] = None
+    origin_country: Optional[str] = None
+    excluded_terms: List[str] = Field(default_factory=list)
+
+
+# Reused system messages, constructed once instead of per request
+_PLAN_SYSTEM_MSG = {"role": "system", "content": "Shopping assistant planner"}
+_REVIEW_SYSTEM_MSG = {"role": "system", "content": "Review analyzer"}
+_COMPARE_SYSTEM_MSG = {"role": "system", "content": "Product comparison expert"}
+_PARSE_SYSTEM_MSG = {"role": "system", "content": "Shopping query analyzer"}
+
 class AgentFramework:
     """V2 enhancement: Agent framework for planning, reasoning and executing multi-step workflows"""
     def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
-        self.user_preferences = {}
+        self.client = _CLIENT
+        # Fail fast when no API key is configured: LLM methods route
+        # straight to their local fallbacks instead of paying a network
+        # round-trip and a 401 on every call
+        self._has_llm = bool(OPENAI_API_KEY)
+        # Disk-backed preference store with a bounded in-memory LRU so
+        # profiles survive restarts without growing RSS per user
+        self.user_preferences = PrefStore(PREFS_DB_PATH)
         self.current_plan = []
         self.current_step = 0
-    
+        # LRU caches so repeat queries skip the LLM round-trip entirely
+        self._plan_cache: OrderedDict = OrderedDict()
+        self._parse_cache: OrderedDict = OrderedDict()
+
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        """Async client bound to the calling event loop; see _get_aclient"""
+        return _get_aclient()
+
+    def _build_plan_request(self, query: str, user_id: Optional[str] = None) -> Dict:
+        """Build the chat completion request body for plan creation"""
+        # Use preferences if available
+        user_context = ""
+        if user_id:
+            prefs = self.user_preferences.get(user_id)
+            if prefs:
+                user_context = f"User preferences: {prefs}"
+
+        prompt = _PLAN_PROMPT_TEMPLATE.format_map({"query": query, "user_context": user_context})
+
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [_PLAN_SYSTEM_MSG, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+            "temperature": 0,
+            # Generation time grows with output length; a 2-3 step plan
+            # fits comfortably under this cap
+            "max_tokens": 300
+        }
+
+    def _pref_hash(self, user_id: Optional[str]) -> int:
+        """Stable hash of the preferences that influence plan creation"""
+        if not user_id:
+            return 0
+        prefs = self.user_preferences.get(user_id)
+        if not prefs:
+            return 0
+        return hash(frozenset(prefs.get("brands", {}).items()))
+
+    @staticmethod
+    def _cache_put(cache: OrderedDict, key, value):
+        """Insert into an LRU cache, evicting the oldest entry when full"""
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > _CACHE_MAX:
+            cache.popitem(last=False)
+
+    def _store_plan(self, plan_data: Dict) -> List[Dict]:
+        """Record a freshly created plan and reset the step pointer"""
+        self.current_plan = plan_data.get("steps", [])
+        self.current_step = 0
+
+        logger.info(f"Created plan with {len(self.current_plan)} steps")
+        return self.current_plan
+
     def create_plan(self, query: str, user_id: Optional[str] = None) -> List[Dict]:
         """Create a multi-step plan for handling a shopping query"""
         try:
-            # Use preferences if available
-            user_context = ""
-            if user_id and user_id in self.user_preferences:
-                user_context = f"User preferences: {self.user_preferences[user_id]}"
-            
-            prompt = f"""
-            Create a 2-3 step plan for this shopping request: "{query}" {user_context}
-            Consider these possible actions:
-            1. search - Initial product search
-            2. filter - Apply additional filters
-            3. analyze_reviews - Analyze customer reviews
-            4. compare - Compare multiple products
-            5. recommend - Make a final recommendation
-            
-            Return JSON with steps array containing: 
-            - step_number: Integer
-            - action: String (one of the above)
-            - parameters: Object with relevant parameters
-            - reasoning: String explaining why this step is needed
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": "Shopping assistant planner"}, 
-                          {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0
-            )
-            
-            plan_data = json.loads(response.choices[0].message.content)
-            self.current_plan = plan_data.get("steps", [])
-            self.current_step = 0
-            
-            logger.info(f"Created plan with {len(self.current_plan)} steps")
-            return self.current_plan
-            
+            if not self._has_llm:
+                return self._store_plan({"steps": [
+                    {"step_number": 1, "action": "search", "parameters": {"query": query}}
+                ]})
+
+            key = (query.strip().lower(), self._pref_hash(user_id))
+            cached = self._plan_cache.get(key)
+            if cached is not None:
+                self._plan_cache.move_to_end(key)
+                logger.info("Plan cache hit, skipping LLM call")
+                return self._store_plan({"steps": copy.deepcopy(cached)})
+
+            request = self._build_plan_request(query, user_id)
+            request["response_format"] = Plan
+            response = self.client.beta.chat.completions.parse(**request)
+            plan = self._store_plan(response.choices[0].message.parsed.model_dump())
+            self._cache_put(self._plan_cache, key, copy.deepcopy(plan))
+            return plan
+
         except Exception as e:
             logger.error(f"Error creating plan: {str(e)}")
             # Fallback to basic plan
             return [{"step_number": 1, "action": "search", "parameters": {"query": query}}]
+
+    async def create_plan_async(self, query: str, user_id: Optional[str] = None) -> List[Dict]:
+        """Async variant of create_plan for use with asyncio.gather"""
+        try:
+            if not self._has_llm:
+                return self._store_plan({"steps": [
+                    {"step_number": 1, "action": "search", "parameters": {"query": query}}
+                ]})
+
+            key = (query.strip().lower(), self._pref_hash(user_id))
+            cached = self._plan_cache.get(key)
+            if cached is not None:
+                self._plan_cache.move_to_end(key)
+                return self._store_plan({"steps": copy.deepcopy(cached)})
+
+            request = self._build_plan_request(query, user_id)
+            request["response_format"] = Plan
+            response = await self.aclient.beta.chat.completions.parse(**request)
+            plan = self._store_plan(response.choices[0].message.parsed.model_dump())
+            self._cache_put(self._plan_cache, key, copy.deepcopy(plan))
+            return plan
+
+        except Exception as e:
+            logger.error(f"Error creating plan: {str(e)}")
+            return [{"step_number": 1, "action": "search", "parameters": {"query": query}}]
+
+    async def run_plan(self, query: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run the independent planning and parsing calls concurrently.
+        Overlaps the network round-trips so wall time is the max of the
+        two latencies instead of their sum. Callers use asyncio.run().
+        """
+        plan, parsed_query = await asyncio.gather(
+            self.create_plan_async(query, user_id),
+            self.parse_query_with_ai_async(query)
+        )
+        return {"plan": plan, "parsed_query": parsed_query}
     
     def get_next_step(self) -> Dict:
         """Get the next step in the current plan"""
@@ -70,21 +411,39 @@ class AgentFramework:
         return step
     
     def update_preferences(self, user_id: str, product_data: Dict, query_data: Dict, action: str = "viewed"):
-        """Learn user preferences from interactions"""
-        if not user_id:
+        """Learn user preferences from a single interaction"""
+        self.update_preferences_batch(user_id, [(product_data, query_data, action)])
+
+    def update_preferences_batch(self, user_id: str, interactions: List[tuple]):
+        """
+        Learn user preferences from several interactions at once.
+        The profile is loaded, mutated, and persisted a single time, so a
+        page of viewed products costs one store round trip instead of one
+        per product. Each interaction is (product_data, query_data, action).
+        """
+        if not user_id or not interactions:
             return
-            
-        if user_id not in self.user_preferences:
-            self.user_preferences[user_id] = {
+
+        prefs = self.user_preferences.get(user_id)
+        if prefs is None:
+            prefs = {
                 "price_ranges": {},
-                "brands": [], 
-                "features": [],
+                "brands": {},
+                "features": {},
                 "categories": {},
-                "interactions": []
+                "interactions": deque(maxlen=100)
             }
-            
-        prefs = self.user_preferences[user_id]
-        
+
+        self._migrate_list_prefs(prefs)
+
+        for product_data, query_data, action in interactions:
+            self._apply_preference_update(prefs, product_data, query_data, action)
+
+        # Write-through so the profile survives restarts
+        self.user_preferences.put(user_id, prefs)
+
+    def _apply_preference_update(self, prefs: Dict, product_data: Dict, query_data: Dict, action: str):
+        """Fold one interaction into an already-loaded preference profile"""
         # Update price preference for category
         category = product_data.get("category", query_data.get("product_type", "general"))
         price = product_data.get("price_value", 0)
@@ -98,59 +457,27 @@ class AgentFramework:
         }
         weight = action_weights.get(action, 1)
         
-        # Update category preference strength
-        if category not in prefs["categories"]:
-            prefs["categories"][category] = weight
-        else:
-            prefs["categories"][category] += weight
-        
+        # Update category preference strength (single hash probe upsert)
+        prefs["categories"][category] = prefs["categories"].get(category, 0) + weight
+
         # Update price range preference
         if price > 0:
-            if category not in prefs["price_ranges"]:
-                prefs["price_ranges"][category] = price
-            else:
-                # Weighted average of prices
-                current = prefs["price_ranges"][category]
-                prefs["price_ranges"][category] = (current + (price * weight)) / (1 + weight)
-                
-        # Update brand preference
+            current = prefs["price_ranges"].get(category)
+            # Weighted average of prices, seeded with the first observation
+            prefs["price_ranges"][category] = (
+                price if current is None else (current + price * weight) / (1 + weight)
+            )
+
+
+        # Update brand preference (name -> weight, O(1) upsert)
         brand = product_data.get("brand")
         if brand:
-            # Check if brand exists
-            brand_exists = False
-            for b in prefs["brands"]:
-                if isinstance(b, dict) and b.get("name") == brand:
-                    b["weight"] += weight
-                    brand_exists = True
-                    break
-                elif isinstance(b, str) and b == brand:
-                    # Convert old format to new format
-                    prefs["brands"].remove(b)
-                    prefs["brands"].append({"name": brand, "weight": weight})
-                    brand_exists = True
-                    break
-                    
-            if not brand_exists:
-                prefs["brands"].append({"name": brand, "weight": weight})
-        
+            prefs["brands"][brand] = prefs["brands"].get(brand, 0) + weight
+
         # Extract and update feature preferences
         features = self._extract_features(product_data)
         for feature in features:
-            feature_exists = False
-            for f in prefs["features"]:
-                if isinstance(f, dict) and f.get("name") == feature:
-                    f["weight"] += weight
-                    feature_exists = True
-                    break
-                elif isinstance(f, str) and f == feature:
-                    # Convert old format to new format
-                    prefs["features"].remove(f)
-                    prefs["features"].append({"name": feature, "weight": weight})
-                    feature_exists = True
-                    break
-                    
-            if not feature_exists:
-                prefs["features"].append({"name": feature, "weight": weight})
+            prefs["features"][feature] = prefs["features"].get(feature, 0) + weight
         
         # Record interaction for future analysis
         prefs["interactions"].append({
@@ -159,159 +486,333 @@ class AgentFramework:
             "action": action,
             "category": category
         })
-        
-        # Prune old interactions
-        if len(prefs["interactions"]) > 100:
-            prefs["interactions"] = prefs["interactions"][-100:]
     
+    @staticmethod
+    def _migrate_list_prefs(prefs: Dict):
+        """
+        Convert legacy list-shaped brand/feature preferences
+        (["Sony", {"name": "Dell", "weight": 2}]) to name -> weight dicts
+        so upserts are O(1) instead of a linear scan per interaction.
+        """
+        for key in ("brands", "features"):
+            entries = prefs.get(key)
+            if isinstance(entries, list):
+                migrated = {}
+                for entry in entries:
+                    if isinstance(entry, dict):
+                        name = entry.get("name")
+                        if name:
+                            migrated[name] = migrated.get(name, 0) + entry.get("weight", 1)
+                    elif entry:
+                        migrated[entry] = migrated.get(entry, 0) + 1
+                prefs[key] = migrated
+
+        # Bound legacy interaction lists the same way new profiles are
+        if isinstance(prefs.get("interactions"), list):
+            prefs["interactions"] = deque(prefs["interactions"], maxlen=100)
+
     def _extract_features(self, product_data: Dict) -> List[str]:
-        """Extract features from product data"""
-        features = []
+        """Extract features from product data in a single pass over the title"""
         title = product_data.get("title", "").lower()
-        
-        # Common feature patterns by category
-        patterns = {
-            "laptop": ["ram", "processor", "ssd", "hdd", "display", "screen", "battery", "graphics"],
-            "phone": ["storage", "camera", "battery", "display", "processor", "ram"],
-            "general": ["wireless", "bluetooth", "waterproof", "portable", "digital"]
-        }
-        
+
         category = product_data.get("category", "general")
-        feature_words = patterns.get(category, patterns["general"])
-        
-        for word in feature_words:
-            if word in title:
-                # Try to extract specification with the feature
-                pattern = rf'(\d+(?:\.\d+)?\s*(?:GB|TB|MP|GHz|inch|hours)?\s*{re.escape(word)})'
-                match = re.search(pattern, title, re.IGNORECASE)
-                if match:
-                    features.append(match.group(0))
-                else:
-                    features.append(word)
-                    
-        return features
+        lexer = _CATEGORY_LEXER.get(category, _CATEGORY_LEXER["general"])
+
+        # Each match pairs an optional spec value (e.g. "16GB") with its
+        # feature word; linear in title length regardless of vocabulary size
+        return [((match.group(1) or "") + match.group(2)).strip()
+                for match in lexer.finditer(title)]
     
-    def analyze_reviews(self, reviews_text: str) -> Dict:
-        """Extract key insights from product reviews"""
+    def submit_batch(self, jobs: List[Dict], poll_interval: float = 30.0, timeout: float = 86400.0) -> Dict[str, Dict]:
+        """
+        Submit independent chat completion calls through OpenAI's Batch API.
+        Useful for offline workloads (nightly preference rebuilds, bulk review
+        analysis) where the ~50% cost reduction outweighs the completion delay.
+        Each job is {"custom_id": str, "body": {chat.completions params}}.
+        Returns a mapping of custom_id -> parsed JSON response content.
+        """
         try:
-            prompt = f"""
-            Analyze these product reviews and extract:
-            1. Overall sentiment (positive/mixed/negative)
-            2. Top 3 strengths mentioned
-            3. Top 3 concerns mentioned
-            4. Most frequently mentioned features
-            5. Reliability assessment (very reliable, reliable, questionable, unreliable)
-            
-            Reviews: {reviews_text[:2000]}
-            
-            Return JSON with: sentiment, strengths (array), concerns (array), features (array), reliability
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": "Review analyzer"}, 
-                          {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0
+            lines = []
+            for job in jobs:
+                lines.append(_json_dumps({
+                    "custom_id": job["custom_id"],
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": job["body"]
+                }))
+
+            # The Batch API requires a .jsonl filename on the upload
+            batch_file = self.client.files.create(
+                file=("batch.jsonl", io.BytesIO("\n".join(lines).encode("utf-8"))),
+                purpose="batch"
             )
-            
-            return json.loads(response.choices[0].message.content)
-            
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"Submitted batch {batch.id} with {len(jobs)} jobs")
+
+            # Poll until the batch reaches a terminal state
+            deadline = time.time() + timeout
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                if time.time() > deadline:
+                    logger.error(f"Batch {batch.id} timed out after {timeout}s")
+                    return {}
+                time.sleep(poll_interval)
+                batch = self.client.batches.retrieve(batch.id)
+
+            if batch.status != "completed":
+                logger.error(f"Batch {batch.id} ended with status: {batch.status}")
+                return {}
+
+            output = self.client.files.content(batch.output_file_id)
+            results = {}
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                data = _json_loads(line)
+                body = data.get("response", {}).get("body", {})
+                choices = body.get("choices", [])
+                if choices:
+                    content = choices[0].get("message", {}).get("content")
+                    if content:
+                        results[data.get("custom_id")] = _json_loads(content)
+
+            logger.info(f"Batch {batch.id} completed with {len(results)} results")
+            return results
+
+        except Exception as e:
+            logger.error(f"Batch submission failed: {str(e)}")
+            return {}
+
+    def _build_review_request(self, reviews_text: Union[str, bytes]) -> Dict:
+        """Build the chat completion request body for review analysis"""
+        prompt = _REVIEW_PROMPT_TEMPLATE.format_map({"reviews": _condense_reviews(reviews_text)})
+
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [_REVIEW_SYSTEM_MSG, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+            "temperature": 0,
+            "max_tokens": 400
+        }
+
+    def _stream_completion(self, request_body: Dict) -> str:
+        """
+        Stream a chat completion and accumulate the content as it arrives.
+        Consuming deltas overlaps network transfer with local work and lets
+        callers abandon a response early instead of blocking on the full body.
+        """
+        parts = []
+        stream = self.client.chat.completions.create(stream=True, **request_body)
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+        return "".join(parts)
+
+    def analyze_reviews_stream(self, reviews_text: Union[str, bytes]):
+        """
+        Generator variant of analyze_reviews that yields content deltas as
+        the model produces them, for callers that render progressively.
+        """
+        fallback = {"sentiment": "unknown", "strengths": [], "concerns": [], "features": [], "reliability": "unknown"}
+        if not self._has_llm:
+            # Same keyless fallback as analyze_reviews, serialized since
+            # callers consume text deltas
+            yield _json_dumps(fallback)
+            return
+
+        produced = False
+        try:
+            stream = self.client.chat.completions.create(
+                stream=True, **self._build_review_request(reviews_text))
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    produced = True
+                    yield delta
+        except Exception as e:
+            logger.error(f"Error streaming review analysis: {str(e)}")
+            # Only substitute the fallback when nothing was emitted; a
+            # partial stream already gave the caller real content
+            if not produced:
+                yield _json_dumps(fallback)
+
+    def analyze_reviews(self, reviews_text: Union[str, bytes], async_ok: bool = False) -> Dict:
+        """
+        Extract key insights from product reviews.
+        Pass async_ok=True for non-interactive callers to route the call
+        through the Batch API instead of a synchronous request.
+        """
+        try:
+            if not self._has_llm:
+                return {"sentiment": "unknown", "strengths": [], "concerns": [], "features": [], "reliability": "unknown"}
+
+            request_body = self._build_review_request(reviews_text)
+
+            if async_ok:
+                results = self.submit_batch([{"custom_id": "analyze_reviews", "body": request_body}])
+                if "analyze_reviews" in results:
+                    return results["analyze_reviews"]
+                # Fall through to the sync path if the batch failed
+
+            return _json_loads(self._stream_completion(request_body))
+
         except Exception as e:
             logger.error(f"Error analyzing reviews: {str(e)}")
             return {"sentiment": "unknown", "strengths": [], "concerns": [], "features": [], "reliability": "unknown"}
-    
-    def compare_products(self, products: List[Dict]) -> Dict:
-        """Generate product comparison based on key attributes"""
+
+    async def analyze_reviews_async(self, reviews_text: Union[str, bytes]) -> Dict:
+        """Async variant of analyze_reviews for use with asyncio.gather"""
+        try:
+            if not self._has_llm:
+                return {"sentiment": "unknown", "strengths": [], "concerns": [], "features": [], "reliability": "unknown"}
+
+            response = await self.aclient.chat.completions.create(
+                **self._build_review_request(reviews_text))
+            return _json_loads(response.choices[0].message.content)
+
+        except Exception as e:
+            logger.error(f"Error analyzing reviews: {str(e)}")
+            return {"sentiment": "unknown", "strengths": [], "concerns": [], "features": [], "reliability": "unknown"}
+
+    def _build_compare_request(self, products: List[Dict]) -> Dict:
+        """Build the chat completion request body for product comparison"""
+        # Prepare product data with feature extraction
+        product_data = []
+        for i, p in enumerate(products[:3]):
+            # Extract key features from title
+            features = []
+            title = _strip_title_boilerplate(p.get("title", "Unknown"))
+            title_lower = title.lower()
+            for keyword, pattern in _COMPARE_PATTERNS.items():
+                if keyword.lower() in title_lower:
+                    match = pattern.search(title)
+                    if match:
+                        features.append(match.group(0))
+
+            product_data.append({
+                "id": i+1,
+                "title": title[:50],
+                "price": p.get("price", "Unknown"),
+                "rating": p.get("rating", "Unknown"),
+                "features": features,
+                "prime": p.get("has_prime", False)
+            })
+
+        prompt = _COMPARE_PROMPT_TEMPLATE.format_map({"products": _encode_products(product_data)})
+
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [_COMPARE_SYSTEM_MSG, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.2,
+            "max_tokens": 500
+        }
+
+    def compare_products(self, products: List[Dict], async_ok: bool = False) -> Dict:
+        """
+        Generate product comparison based on key attributes.
+        Pass async_ok=True for non-interactive callers to route the call
+        through the Batch API instead of a synchronous request.
+        """
         try:
             if len(products) < 2:
                 return {"error": "Need at least 2 products"}
-                
-            # Prepare product data with feature extraction
-            product_data = []
-            for i, p in enumerate(products[:3]):
-                # Extract key features from title
-                features = []
-                title = p.get("title", "Unknown")
-                for keyword in ["RAM", "processor", "CPU", "battery", "display", "weight", "storage", "SSD", "resolution"]:
-                    if keyword.lower() in title.lower():
-                        pattern = r'(\d+(?:\.\d+)?\s*(?:GB|TB|GHz|inch|hours|lbs)?\s*' + keyword + r')'
-                        match = re.search(pattern, title, re.IGNORECASE)
-                        if match:
-                            features.append(match.group(0))
-                
-                product_data.append({
-                    "id": i+1,
-                    "title": p.get("title", "Unknown")[:50],
-                    "price": p.get("price", "Unknown"),
-                    "rating": p.get("rating", "Unknown"),
-                    "features": features,
-                    "prime": p.get("has_prime", False)
-                })
-            
-            prompt = f"""
-            Compare these products on price, quality, and value for a shopper. Products: 
-            {json.dumps(product_data)}
-            
-            Return JSON with: 
-            - best_overall: ID of best overall product
-            - best_value: ID of best value product
-            - comparison_table: Array of feature comparisons
-            - summary: Detailed analysis of strengths and weaknesses
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": "Product comparison expert"}, 
-                          {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.2
-            )
-            
-            return json.loads(response.choices[0].message.content)
-            
+            if not self._has_llm:
+                return {"error": "Comparison requires an OpenAI API key"}
+
+            request_body = self._build_compare_request(products)
+
+            if async_ok:
+                results = self.submit_batch([{"custom_id": "compare_products", "body": request_body}])
+                if "compare_products" in results:
+                    return results["compare_products"]
+                # Fall through to the sync path if the batch failed
+
+            return _json_loads(self._stream_completion(request_body))
+
         except Exception as e:
             logger.error(f"Error comparing products: {str(e)}")
             return {"error": str(e)}
-    
+
+    async def compare_products_async(self, products: List[Dict]) -> Dict:
+        """Async variant of compare_products for use with asyncio.gather"""
+        try:
+            if len(products) < 2:
+                return {"error": "Need at least 2 products"}
+            if not self._has_llm:
+                return {"error": "Comparison requires an OpenAI API key"}
+
+            response = await self.aclient.chat.completions.create(
+                **self._build_compare_request(products))
+            return _json_loads(response.choices[0].message.content)
+
+        except Exception as e:
+            logger.error(f"Error comparing products: {str(e)}")
+            return {"error": str(e)}
+
+    def _build_parse_request(self, query: str) -> Dict:
+        """Build the chat completion request body for query parsing"""
+        prompt = _PARSE_PROMPT_TEMPLATE.format_map({"query": query})
+
+        return {
+            "model": "gpt-3.5-turbo",
+            "messages": [_PARSE_SYSTEM_MSG, {"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+            "temperature": 0,
+            "max_tokens": 250
+        }
+
     def parse_query_with_ai(self, query: str) -> Dict:
         """Use AI to parse shopping query with advanced understanding"""
         try:
-            if not OPENAI_API_KEY:
+            if not self._has_llm:
                 # Fallback to regex parser
-                from agent.query_parser import QueryParser
-                return QueryParser().parse_shopping_query(query)
-                
-            prompt = f"""
-            Parse this shopping query into structured parameters:
-            "{query}"
-            
-            Return JSON with:
-            - product_type: Main product category
-            - price_range: {{min, max}} (numbers)
-            - keywords: Array of important features or requirements
-            - rating_min: Minimum star rating (number)
-            - prime_shipping: Boolean if Prime is requested
-            - exact_rating_min: Precise rating threshold if specified
-            - material: Material requirement if specified
-            - origin_country: Country of origin if specified
-            - excluded_terms: Terms to exclude
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": "Shopping query analyzer"}, 
-                          {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0
-            )
-            
-            return json.loads(response.choices[0].message.content)
+                return _QUERY_PARSER.parse_shopping_query(query)
+
+            key = query.strip().lower()
+            cached = self._parse_cache.get(key)
+            if cached is not None:
+                self._parse_cache.move_to_end(key)
+                return copy.deepcopy(cached)
+
+            request = self._build_parse_request(query)
+            request["response_format"] = ParsedQuery
+            response = self.client.beta.chat.completions.parse(**request)
+
+            parsed = response.choices[0].message.parsed.model_dump()
+            self._cache_put(self._parse_cache, key, copy.deepcopy(parsed))
+            return parsed
         except Exception as e:
             logger.error(f"AI parsing failed: {str(e)}")
             # Fallback to regex parsing
-            from agent.query_parser import QueryParser
-            return QueryParser().parse_shopping_query(query)
+            return _QUERY_PARSER.parse_shopping_query(query)
+
+    async def parse_query_with_ai_async(self, query: str) -> Dict:
+        """Async variant of parse_query_with_ai for use with asyncio.gather"""
+        try:
+            if not self._has_llm:
+                return _QUERY_PARSER.parse_shopping_query(query)
+
+            key = query.strip().lower()
+            cached = self._parse_cache.get(key)
+            if cached is not None:
+                self._parse_cache.move_to_end(key)
+                return copy.deepcopy(cached)
+
+            request = self._build_parse_request(query)
+            request["response_format"] = ParsedQuery
+            response = await self.aclient.beta.chat.completions.parse(**request)
+
+            parsed = response.choices[0].message.parsed.model_dump()
+            self._cache_put(self._parse_cache, key, copy.deepcopy(parsed))
+            return parsed
+        except Exception as e:
+            logger.error(f"AI parsing failed: {str(e)}")
+            return _QUERY_PARSER.parse_shopping_query(query)
     
     def suggest_refinements(self, query_data: Dict, products: List[Dict]) -> List[str]:
         """Suggest potential refinements based on initial results"""
@@ -322,37 +823,43 @@ class AgentFramework:
             suggestions = []
             
             # Price-based suggestions
-            prices = [p.get("price_value", 0) for p in products if p.get("price_value", 0) > 0]
-            if prices:
-                avg_price = sum(prices) / len(prices)
-                min_price = min(prices)
-                max_price = max(prices)
-                
+            price_stats = _field_stats(products, "price_value")
+            if price_stats:
+                avg_price, min_price, _ = price_stats
+
                 price_range_min = query_data.get("price_range", {}).get("min", 0)
                 price_range_max = query_data.get("price_range", {}).get("max", float('inf'))
-                
+
                 if price_range_max and avg_price > price_range_max * 0.9:
                     suggestions.append(f"Increase your budget (most items are around ${avg_price:.2f})")
                 elif price_range_min and min_price > price_range_min * 1.5:
                     suggestions.append(f"Might need a higher budget (cheapest item is ${min_price:.2f})")
-            
+
             # Rating-based suggestions
-            ratings = [p.get("rating_value", 0) for p in products if p.get("rating_value", 0) > 0]
-            if ratings:
-                avg_rating = sum(ratings) / len(ratings)
-                if avg_rating < 4.0:
-                    suggestions.append("Consider higher-rated alternatives")
+            rating_stats = _field_stats(products, "rating_value")
+            if rating_stats and rating_stats[0] < 4.0:
+                suggestions.append("Consider higher-rated alternatives")
             
+            # Feature/Prime flags in a single pass over the product list
+            has_ssd = has_ram = has_prime = False
+            for p in products:
+                title = p.get("title", "")
+                has_ssd = has_ssd or "SSD" in title
+                has_ram = has_ram or "RAM" in title
+                has_prime = has_prime or bool(p.get("has_prime"))
+                if has_ssd and has_ram and has_prime:
+                    break
+
             # Feature-based suggestions
             product_type = query_data.get("product_type", "")
             if product_type == "laptop":
-                if not any("SSD" in p.get("title", "") for p in products):
+                if not has_ssd:
                     suggestions.append("Specify SSD storage for faster performance")
-                if not any("RAM" in p.get("title", "") for p in products):
+                if not has_ram:
                     suggestions.append("Specify RAM requirements")
-            
+
             # Prime shipping suggestion
-            if not query_data.get("prime_shipping") and any(p.get("has_prime") for p in products):
+            if not query_data.get("prime_shipping") and has_prime:
                 suggestions.append("Filter for Prime shipping")
             
             # Add general suggestions if needed
@@ -1,11 +1,106 @@
 import logging
 import re
 from typing import Dict, List, Any, Optional
-from config.settings import AMAZON_BASE_URL
+from urllib.parse import quote, quote_plus, urljoin, urlsplit
+from config.settings import AMAZON_BASE_URL, STEALTH_TYPING
 from .browser_manager import BrowserManager
 
 logger = logging.getLogger(__name__)
 
+# Amazon refinement nodes for the rh= URL parameter: combining price,
+# rating and Prime into a single navigation replaces one page reload per
+# filter with one reload total
+_RATING_REFINEMENTS = {
+    4: "p_72:1248882011",
+    3: "p_72:1248883011",
+    2: "p_72:1248884011",
+    1: "p_72:1248885011"
+}
+_PRIME_REFINEMENT = "p_85:2470955011"
+
+# Compiled once: the extraction loop hits these on every product
+_PRICE_RE = re.compile(r'\d+(?:\.\d+)?')
+_RATING_RE = re.compile(r'(\d+(\.\d+)?)')
+_REVIEWS_RE = re.compile(r'(\d+)')
+_ASIN_RE = re.compile(r'/dp/([A-Z0-9]{10})(?:/|$)')
+
+# Single-pass C-level strip of currency symbols, commas and spaces
+_PRICE_STRIP_TBL = str.maketrans('', '', '$, ')
+
+# Runs inside the browser so the whole result page is scraped in a single
+# protocol round trip instead of dozens of per-element query_selector /
+# inner_text calls (each one a blocking IPC to the browser process).
+# Mirrors the Python fallback selector chains exactly; raw strings are
+# returned and all parsing stays in Python.
+_EXTRACT_RESULTS_JS = """
+(maxResults) => {
+    const results = [];
+    const elements = document.querySelectorAll("[data-component-type='s-search-result']");
+    for (let i = 0; i < elements.length && i < maxResults; i++) {
+        const el = elements[i];
+        const text = (sel) => {
+            const node = el.querySelector(sel);
+            return node ? node.innerText.trim() : null;
+        };
+        const attr = (sel, name) => {
+            const node = el.querySelector(sel);
+            return node ? node.getAttribute(name) : null;
+        };
+
+        // Title: standard selector, then the joined alternates (one DOM
+        // walk picks the first match), then the aria-label
+        let title = text("h2 a span");
+        if (!title) {
+            const alt = text("h2 .a-link-normal, " +
+                             ".a-size-medium.a-color-base.a-text-normal, " +
+                             ".a-size-base-plus.a-color-base.a-text-normal");
+            if (alt && alt.length > 5) title = alt;
+        }
+        if (!title) {
+            const aria = attr("h2 a", "aria-label");
+            if (aria && aria.length > 5) title = aria;
+        }
+
+        // Price: offscreen text, else whole + fraction parts
+        let price = text(".a-price .a-offscreen");
+        if (!price) {
+            const whole = text(".a-price-whole");
+            const fraction = text(".a-price-fraction");
+            if (whole && fraction) price = "$" + whole + "." + fraction;
+        }
+
+        const rating = text("span.a-icon-alt, .a-icon-star-small .a-icon-alt");
+
+        let reviews = text("span.a-size-base.s-underline-text");
+        if (!reviews) {
+            const alt = text("a .a-size-base");
+            if (alt && /^[\\d,]+$/.test(alt)) reviews = alt;
+        }
+
+        // The .href property is the browser-resolved absolute URL, so
+        // Python never needs to join relative links
+        let href = null;
+        const linkSelectors = ["h2 a", ".a-link-normal.s-no-outline", ".a-link-normal.s-underline-text"];
+        for (const sel of linkSelectors) {
+            const node = el.querySelector(sel);
+            if (node && node.href) { href = node.href; break; }
+        }
+
+        results.push({
+            title: title,
+            price: price,
+            rating: rating,
+            reviews: reviews,
+            href: href,
+            asin: el.getAttribute("data-asin"),
+            hasPrime: !!el.querySelector("i.a-icon-prime, span.aok-relative span.a-icon-prime"),
+            image: attr("img.s-image", "src")
+        });
+    }
+    return results;
+}
+"""
+
 class AmazonNavigator:
     """
     Handles navigation and interaction with Amazon website.
@@ -14,6 +109,9 @@ class AmazonNavigator:
     def __init__(self, browser_manager: BrowserManager):
         self.browser_manager = browser_manager
         self.page = None
+        # Per-result-page memo of filter selector probes, so follow-up
+        # refinements of the same result set skip the is_visible round trips
+        self._filter_cache = {}
         
     def initialize(self):
         """Initialize the browser and navigate to Amazon"""
@@ -24,6 +122,7 @@ class AmazonNavigator:
     def navigate_to_home(self):
         """Navigate to Amazon homepage"""
         try:
+            self.browser_manager.flush_delay()
             self.page.goto(AMAZON_BASE_URL)
             self.browser_manager.random_delay()
             logger.info("Navigated to Amazon homepage")
@@ -32,19 +131,34 @@ class AmazonNavigator:
             logger.error(f"Failed to navigate to Amazon: {str(e)}")
             return False
     
+    def _filter_probes(self) -> Dict[str, Any]:
+        """Memoized selector-probe results for the current results page"""
+        key = self.page.url.split("?", 1)[0]
+        return self._filter_cache.setdefault(key, {})
+
     def search_products(self, query: str):
         """Search for products with the given query"""
         try:
+            # New result set: cached filter probes no longer apply
+            self._filter_cache.clear()
             # Clear any existing search text
             self.page.fill("input#twotabsearchtextbox", "")
             self.browser_manager.random_delay(0.5, 1.5)
-            
-            # Type the query with slight pauses to appear human
-            for char in query:
-                self.page.type("input#twotabsearchtextbox", char)
-                self.browser_manager.random_delay(0.01, 0.05)
-                
-            self.browser_manager.random_delay()
+
+            if STEALTH_TYPING:
+                # Type the query with slight pauses to appear human; the
+                # pause must land between keystrokes, so flush each one
+                # instead of letting them accumulate into a single sleep
+                for char in query:
+                    self.page.type("input#twotabsearchtextbox", char)
+                    self.browser_manager.random_delay(0.01, 0.05)
+                    self.browser_manager.flush_delay()
+            else:
+                # One round trip instead of a protocol call + sleep per
+                # character; this dominated search latency
+                self.page.fill("input#twotabsearchtextbox", query)
+
+            self.browser_manager.flush_delay()
             self.page.press("input#twotabsearchtextbox", "Enter")
             
             # Wait for search results to load
@@ -57,11 +171,65 @@ class AmazonNavigator:
             logger.error(f"Failed to search products: {str(e)}")
             return False
     
+    def _build_refinements(self, parsed_query: Dict[str, Any]) -> str:
+        """Map parsed-query filters to Amazon's rh= refinement syntax"""
+        parts = []
+
+        price_range = parsed_query.get("price_range") or {}
+        min_price = price_range.get("min")
+        max_price = price_range.get("max")
+        if min_price or max_price:
+            low = int((min_price or 0) * 100)
+            high = int(max_price * 100) if max_price else ""
+            parts.append(f"p_36:{low}-{high}")
+
+        rating_min = parsed_query.get("rating_min")
+        if rating_min:
+            node = _RATING_REFINEMENTS.get(min(4, max(1, int(rating_min))))
+            if node:
+                parts.append(node)
+
+        if parsed_query.get("prime_shipping"):
+            parts.append(_PRIME_REFINEMENT)
+
+        return ",".join(parts)
+
+    def search_and_filter(self, query: str, parsed_query: Dict[str, Any]) -> bool:
+        """
+        Search with all filters applied in a single navigation via the
+        rh= refinement parameter, instead of one page reload per filter.
+        Returns False so callers can fall back to the click-based path.
+        """
+        try:
+            self._filter_cache.clear()
+            refinements = self._build_refinements(parsed_query)
+            if not refinements:
+                return self.search_products(query)
+
+            url = f"{AMAZON_BASE_URL}/s?k={quote_plus(query)}&rh={quote(refinements, safe=':,-')}"
+            self.browser_manager.flush_delay()
+            self.page.goto(url)
+
+            # Wait for search results to load
+            self.page.wait_for_selector("[data-component-type='s-search-result']", timeout=10000)
+            self.browser_manager.random_delay()
+
+            logger.info(f"Searched for: {query} with refinements: {refinements}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to search with refinements: {str(e)}")
+            return False
+
     def apply_price_filter(self, min_price: Optional[float] = None, max_price: Optional[float] = None):
         """Apply price range filter if specified"""
         try:
-            # Check if price filter exists on this page
-            if not self.page.is_visible("#priceRefinements"):
+            # Check if price filter exists on this page (memoized per page)
+            probes = self._filter_probes()
+            has_price = probes.get("has_price")
+            if has_price is None:
+                has_price = self.page.is_visible("#priceRefinements")
+                probes["has_price"] = has_price
+            if not has_price:
                 logger.info("Price refinements not available on this page")
                 return False
                 
@@ -77,6 +245,7 @@ class AmazonNavigator:
             
             # If either price was set, click Go button
             if (min_price is not None or max_price is not None) and self.page.is_visible('span.a-button-inner input[type="submit"]'):
+                self.browser_manager.flush_delay()
                 self.page.click('span.a-button-inner input[type="submit"]')
                 self.page.wait_for_load_state("networkidle")
                 self.browser_manager.random_delay()
@@ -91,21 +260,32 @@ class AmazonNavigator:
     def apply_prime_filter(self):
         """Apply Amazon Prime filter"""
         try:
-            # Look for Prime checkbox in different possible locations
+            # Look for Prime checkbox in different possible locations,
+            # remembering which selector worked for this results page
             prime_selectors = [
                 'span:has-text("Prime Eligible") >> xpath=../preceding-sibling::div//input[@type="checkbox"]',
                 'span:has-text("Prime") >> xpath=../preceding-sibling::div//input[@type="checkbox"]',
                 '[aria-label="Prime Eligible"]'
             ]
-            
-            for selector in prime_selectors:
-                if self.page.is_visible(selector):
-                    self.page.click(selector)
-                    self.page.wait_for_load_state("networkidle")
-                    self.browser_manager.random_delay()
-                    logger.info("Applied Prime filter")
-                    return True
-            
+
+            probes = self._filter_probes()
+            selector = probes.get("prime_selector")
+            if selector is None:
+                selector = ""
+                for candidate in prime_selectors:
+                    if self.page.is_visible(candidate):
+                        selector = candidate
+                        break
+                probes["prime_selector"] = selector
+
+            if selector:
+                self.browser_manager.flush_delay()
+                self.page.click(selector)
+                self.page.wait_for_load_state("networkidle")
+                self.browser_manager.random_delay()
+                logger.info("Applied Prime filter")
+                return True
+
             logger.info("Prime filter not found")
             return False
         except Exception as e:
@@ -128,7 +308,14 @@ class AmazonNavigator:
             }
             
             selector = rating_selector_map.get(min_rating)
-            if self.page.is_visible(selector):
+            probes = self._filter_probes().setdefault("rating_visible", {})
+            visible = probes.get(min_rating)
+            if visible is None:
+                visible = self.page.is_visible(selector)
+                probes[min_rating] = visible
+
+            if visible:
+                self.browser_manager.flush_delay()
                 self.page.click(selector)
                 self.page.wait_for_load_state("networkidle")
                 self.browser_manager.random_delay()
@@ -146,136 +333,28 @@ class AmazonNavigator:
         try:
             # Wait for search results to load
             self.page.wait_for_selector("[data-component-type='s-search-result']", timeout=10000)
-            
-            # Extract product information
+
+            # One evaluate call scrapes every result card inside the browser;
+            # only raw strings cross the protocol boundary
+            raw_items = self.page.evaluate(_EXTRACT_RESULTS_JS, max_results)
+
             products = []
-            product_elements = self.page.query_selector_all("[data-component-type='s-search-result']")
-            
-            for i, element in enumerate(product_elements):
-                if i >= max_results:
-                    break
-                
+            for i, raw in enumerate(raw_items):
                 try:
-                    # FIX: Multiple approaches to extract title correctly
-                    title = "Unknown Title"
-                    
-                    # Approach 1: Standard title selector
-                    title_element = element.query_selector("h2 a span")
-                    if title_element:
-                        title = title_element.inner_text()
-                    
-                    # Approach 2: Alternative selectors if the first one failed
-                    if title == "Unknown Title":
-                        alt_title_selectors = [
-                            "h2 .a-link-normal", 
-                            ".a-size-medium.a-color-base.a-text-normal",
-                            ".a-size-base-plus.a-color-base.a-text-normal"
-                        ]
-                        for selector in alt_title_selectors:
-                            alt_title_element = element.query_selector(selector)
-                            if alt_title_element:
-                                alt_title = alt_title_element.inner_text()
-                                if alt_title and len(alt_title) > 5:  # Ensure it's not empty or too short
-                                    title = alt_title
-                                    break
-                    
-                    # Approach 3: Try to get the title from the a tag's aria-label
-                    if title == "Unknown Title":
-                        a_element = element.query_selector("h2 a")
-                        if a_element:
-                            aria_label = a_element.get_attribute("aria-label")
-                            if aria_label and len(aria_label) > 5:
-                                title = aria_label
-                    
-                    # Extract price with multiple approaches
-                    price_whole_element = element.query_selector(".a-price-whole")
-                    price_fraction_element = element.query_selector(".a-price-fraction")
-                    price_element = element.query_selector(".a-price .a-offscreen")
-                    
-                    # Try different price extraction methods
-                    price = "Price not available"
-                    if price_element:
-                        price = price_element.inner_text()
-                    elif price_whole_element and price_fraction_element:
-                        price = f"${price_whole_element.inner_text()}.{price_fraction_element.inner_text()}"
-                    
-                    # Extract rating with multiple approaches
-                    rating = "No rating"
-                    rating_element = element.query_selector("span.a-icon-alt")
-                    if rating_element:
-                        rating = rating_element.inner_text()
-                    
-                    # Alternative rating selector
-                    if rating == "No rating":
-                        alt_rating_element = element.query_selector(".a-icon-star-small .a-icon-alt")
-                        if alt_rating_element:
-                            rating = alt_rating_element.inner_text()
-                    
-                    # Extract reviews
-                    reviews = "0"
-                    reviews_element = element.query_selector("span.a-size-base.s-underline-text")
-                    if reviews_element:
-                        reviews = reviews_element.inner_text()
-                    
-                    # Alternative reviews selector
-                    if reviews == "0":
-                        alt_reviews_element = element.query_selector("a .a-size-base")
-                        if alt_reviews_element:
-                            reviews_text = alt_reviews_element.inner_text()
-                            if reviews_text and reviews_text.replace(',', '').isdigit():
-                                reviews = reviews_text
-                    
+                    title = raw.get("title") or "Unknown Title"
+                    price = raw.get("price") or "Price not available"
+                    rating = raw.get("rating") or "No rating"
+                    reviews = raw.get("reviews") or "0"
+
                     # Extract numeric rating
                     rating_value = 0.0
                     if rating != "No rating":
-                        rating_match = re.search(r'(\d+(\.\d+)?)', rating)
+                        rating_match = _RATING_RE.search(rating)
                         if rating_match:
                             rating_value = float(rating_match.group(1))
-                    
-                    # FIXED: Extract link with improved approach
-                    link = None
-                    # Try multiple selectors for links
-                    link_selectors = [
-                        "h2 a",
-                        ".a-link-normal.s-no-outline",
-                        ".a-link-normal.s-underline-text"
-                    ]
-                    
-                    for selector in link_selectors:
-                        link_element = element.query_selector(selector)
-                        if link_element:
-                            href = link_element.get_attribute("href")
-                            if href:
-                                # If it's a relative URL, make it absolute
-                                if href.startswith("/"):
-                                    link = f"{AMAZON_BASE_URL}{href}"
-                                else:
-                                    # Extract ASIN from the URL if possible
-                                    asin_match = re.search(r'/dp/([A-Z0-9]{10})(?:/|$)', href)
-                                    if asin_match:
-                                        asin = asin_match.group(1)
-                                        link = f"{AMAZON_BASE_URL}/dp/{asin}"
-                                    else:
-                                        # Use the href as is if we can't extract ASIN
-                                        link = href
-                                break
-                    
-                    # Fallback for link: Try to find data-asin attribute and construct URL
-                    if not link:
-                        asin = element.get_attribute("data-asin")
-                        if asin:
-                            link = f"{AMAZON_BASE_URL}/dp/{asin}"
-                    
-                    # Extract Prime status
-                    prime_element = element.query_selector("i.a-icon-prime")
-                    if not prime_element:
-                        prime_element = element.query_selector("span.aok-relative span.a-icon-prime")
-                    has_prime = bool(prime_element)
-                    
-                    # Extract product image
-                    img_element = element.query_selector("img.s-image")
-                    img_url = img_element.get_attribute("src") if img_element else None
-                    
+
+                    link = self._normalize_link(raw.get("href"), raw.get("asin"))
+
                     product = {
                         "title": title,
                         "price": price,
@@ -284,65 +363,57 @@ class AmazonNavigator:
                         "rating_value": rating_value,
                         "reviews": reviews,
                         "review_count": self._extract_review_count(reviews),
-                        "has_prime": has_prime,
+                        "has_prime": bool(raw.get("hasPrime")),
                         "link": link,
-                        "image": img_url
+                        "image": raw.get("image")
                     }
-                    
+
                     # Only add products with valid links
                     if link:
                         products.append(product)
                     else:
                         logger.warning(f"Skipping product with missing link: {title}")
-                    
+
                 except Exception as e:
                     logger.warning(f"Failed to extract product {i}: {str(e)}")
-            
+
             # If we have fewer products than requested, try to add some even without links
-            if len(products) < min(3, max_results) and product_elements:
-                for i, element in enumerate(product_elements):
-                    if i >= max_results:
-                        break
-                        
+            if len(products) < min(3, max_results) and raw_items:
+                kept_titles = {p.get("title") for p in products}
+                for i, raw in enumerate(raw_items):
                     try:
-                        title_element = element.query_selector("h2 a span")
-                        if title_element:
-                            title = title_element.inner_text()
-                            
-                            # Only add if this product isn't already in our list
-                            if not any(p.get('title') == title for p in products):
-                                # Create basic product with whatever data we can extract
-                                basic_product = {
-                                    "title": title,
-                                    "price": "Price not available",
-                                    "price_value": 0.0,
-                                    "rating": "No rating",
-                                    "rating_value": 0.0,
-                                    "reviews": "0",
-                                    "review_count": 0,
-                                    "has_prime": False,
-                                    # Create a dummy link with the ASIN if available
-                                    "link": f"{AMAZON_BASE_URL}/s?k={title.replace(' ', '+')}"
-                                }
-                                
-                                # Try to extract price and rating if possible
-                                price_element = element.query_selector(".a-price .a-offscreen")
-                                if price_element:
-                                    basic_product["price"] = price_element.inner_text()
-                                    basic_product["price_value"] = self._extract_price_value(basic_product["price"])
-                                    
-                                rating_element = element.query_selector("span.a-icon-alt")
-                                if rating_element:
-                                    basic_product["rating"] = rating_element.inner_text()
-                                    rating_match = re.search(r'(\d+(\.\d+)?)', basic_product["rating"])
-                                    if rating_match:
-                                        basic_product["rating_value"] = float(rating_match.group(1))
-                                
-                                products.append(basic_product)
-                                
+                        title = raw.get("title")
+                        if not title or title in kept_titles:
+                            continue
+
+                        # Create basic product with whatever data we can extract
+                        basic_product = {
+                            "title": title,
+                            "price": raw.get("price") or "Price not available",
+                            "price_value": 0.0,
+                            "rating": raw.get("rating") or "No rating",
+                            "rating_value": 0.0,
+                            "reviews": "0",
+                            "review_count": 0,
+                            "has_prime": False,
+                            # Create a dummy link from the title as a last resort
+                            "link": f"{AMAZON_BASE_URL}/s?k={title.replace(' ', '+')}"
+                        }
+
+                        if basic_product["price"] != "Price not available":
+                            basic_product["price_value"] = self._extract_price_value(basic_product["price"])
+
+                        if basic_product["rating"] != "No rating":
+                            rating_match = _RATING_RE.search(basic_product["rating"])
+                            if rating_match:
+                                basic_product["rating_value"] = float(rating_match.group(1))
+
+                        products.append(basic_product)
+                        kept_titles.add(title)
+
                     except Exception as e:
                         logger.warning(f"Failed to extract fallback product {i}: {str(e)}")
-            
+
             logger.info(f"Extracted {len(products)} products")
             
             # Debug log to check links
@@ -357,13 +428,30 @@ class AmazonNavigator:
             logger.error(f"Failed to extract search results: {str(e)}")
             return []
     
+    def _normalize_link(self, href: Optional[str], asin: Optional[str]) -> Optional[str]:
+        """Build an absolute product link from a raw href or data-asin value"""
+        if href:
+            # C-level join handles relative URLs in one pass
+            full_link = urljoin(AMAZON_BASE_URL, href)
+            # Prefer the canonical /dp/ASIN form when we can extract it
+            asin_match = _ASIN_RE.search(full_link)
+            if asin_match:
+                return f"{AMAZON_BASE_URL}/dp/{asin_match.group(1)}"
+            # Otherwise strip the tracking query/fragment
+            return urlsplit(full_link)._replace(query="", fragment="").geturl()
+
+        # Fallback: construct the URL from the element's data-asin attribute
+        if asin:
+            return f"{AMAZON_BASE_URL}/dp/{asin}"
+        return None
+
     def _extract_price_value(self, price_str: str) -> float:
         """Extract numeric price value from price string"""
         try:
-            # Remove currency symbols and commas
-            cleaned = price_str.replace('$', '').replace(',', '').replace(' ', '')
+            # Remove currency symbols, commas and spaces in one pass
+            cleaned = price_str.translate(_PRICE_STRIP_TBL)
             # Try to extract the first valid number
-            match = re.search(r'\d+(\.\d+)?', cleaned)
+            match = _PRICE_RE.search(cleaned)
             if match:
                 return float(match.group(0))
             return 0.0
@@ -375,7 +463,7 @@ class AmazonNavigator:
         try:
             # Remove commas and extract number
             cleaned = reviews_str.replace(',', '')
-            match = re.search(r'(\d+)', cleaned)
+            match = _REVIEWS_RE.search(cleaned)
             if match:
                 return int(match.group(1))
             return 0
@@ -1,8 +1,9 @@
+import os
 import time
 import random
 import logging
 from playwright.sync_api import sync_playwright
-from config.settings import USER_AGENT, HEADLESS, DELAY_MIN, DELAY_MAX
+from config.settings import USER_AGENT, HEADLESS, DELAY_MIN, DELAY_MAX, STORAGE_STATE_PATH
 
 logger = logging.getLogger(__name__)
 
@@ -17,53 +18,85 @@ class BrowserManager:
         self.browser = None
         self.context = None
         self.page = None
-        
+        self._initialized = False
+        self._pending_delay = 0.0
+
     def start(self):
         """Initialize the browser session with appropriate settings"""
+        # Reuse the live session across conversation turns instead of
+        # launching a fresh browser (and paying a cold page load) per caller
+        if self._initialized and self.page:
+            return self.page
+
         try:
             logger.info("Starting browser session")
             self.playwright = sync_playwright().start()
             self.browser = self.playwright.chromium.launch(headless=HEADLESS)
-            
-            # Configure context with custom user agent and viewport
-            self.context = self.browser.new_context(
-                user_agent=USER_AGENT,
-                viewport={"width": 1280, "height": 720},
-                locale="en-US"
-            )
-            
+
+            # Configure context with custom user agent and viewport;
+            # saved cookies/session state skip warm-up round trips
+            context_args = {
+                "user_agent": USER_AGENT,
+                "viewport": {"width": 1280, "height": 720},
+                "locale": "en-US"
+            }
+            if os.path.exists(STORAGE_STATE_PATH):
+                context_args["storage_state"] = STORAGE_STATE_PATH
+            self.context = self.browser.new_context(**context_args)
+
             # Enable JS console logging for debugging
             self.context.on("console", lambda msg: logger.debug(f"Browser console: {msg.text}"))
-            
+
             self.page = self.context.new_page()
+            self._initialized = True
             return self.page
         except Exception as e:
             logger.error(f"Failed to start browser: {str(e)}")
             self.close()
             raise
-    
+
     def close(self):
         """Close all browser resources to prevent memory leaks"""
         logger.info("Closing browser session")
         if self.context:
+            # Persist cookies/session state for faster warm starts
+            try:
+                self.context.storage_state(path=STORAGE_STATE_PATH)
+            except Exception as e:
+                logger.warning(f"Failed to save browser state: {str(e)}")
             self.context.close()
         if self.browser:
             self.browser.close()
         if self.playwright:
             self.playwright.stop()
+        self._initialized = False
     
     def random_delay(self, min_delay=None, max_delay=None):
         """
-        Add a random delay to simulate human behavior
-        Optionally override default delay range with custom values
+        Add a random delay to simulate human behavior.
+        Delays accumulate and are slept in one batch by flush_delay(),
+        so a sequence of actions costs one sleep instead of one each.
+        Optionally override default delay range with custom values.
         """
         min_delay = min_delay if min_delay is not None else DELAY_MIN
         max_delay = max_delay if max_delay is not None else DELAY_MAX
-        
+
         delay = random.uniform(min_delay, max_delay)
         logger.debug(f"Adding random delay of {delay:.2f}s")
-        time.sleep(delay)
-        
+        self._pending_delay += delay
+
+    def flush_delay(self):
+        """
+        Sleep once for all accumulated delay. Called before actions that
+        hit the network, so the pacing happens where it matters and
+        blocking Playwright waits absorb the rest.
+        """
+        if self._pending_delay > 0:
+            logger.debug(f"Sleeping {self._pending_delay:.2f}s of accumulated delay")
+            time.sleep(self._pending_delay)
+            self._pending_delay = 0.0
+
+
     def add_human_behavior(self):
         """Add random mouse movements to appear more human-like"""
         try:
@@ -1,7 +1,12 @@
+import functools
+import hashlib
 import logging
 import re
 import json
 import time
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from .query_parser import QueryParser
 from .amazon_navigator import AmazonNavigator
@@ -9,10 +14,96 @@ from .product_analyzer import ProductAnalyzer
 from .product_researcher import ProductResearcher
 from .browser_manager import BrowserManager
 from .agent_framework import AgentFramework
-from config.settings import OPENAI_API_KEY, AMAZON_BASE_URL
+from .research_cache import ResearchCache
+from config.settings import OPENAI_API_KEY, AMAZON_BASE_URL, RESEARCH_CACHE_PATH
 
 logger = logging.getLogger(__name__)
 
+# Bound on the extracted-results cache: repeat queries with identical
+# filters skip the whole search/filter/extract browser round trip
+_RESULTS_CACHE_MAX = 16
+
+# Follow-up detection vocabularies, compiled once per process. Each
+# alternation preserves the original substring-membership semantics while
+# scanning the message a single time instead of once per phrase.
+_DIRECT_COMMAND_RE = re.compile("|".join(map(re.escape, [
+    "compare", "compare products", "compare top products",
+    "reviews", "read reviews", "read in-depth review analysis",
+    "details", "specifications", "specs", "see detailed product specifications",
+    "tell me more", "more information", "learn more"
+])))
+_FOLLOWUP_PHRASE_RE = re.compile(
+    r"show me|more details|cheaper|better|what about|how about|features|price|shipping")
+_PRONOUN_RE = re.compile(r"it|this|that|these|those|they")
+_COMMAND_VERB_RE = re.compile(r"show|get|tell|find")
+_PRODUCT_NOUN_RE = re.compile(r"product|item|laptop|phone")
+_PRODUCT_NUM_RE = re.compile(r'#?(\d+)')
+
+# Intent vocabulary for _get_intent: one combined alternation scans the
+# message a single time and tags each hit with its intent via the group
+# name, instead of one pass per intent class
+_INTENT_RE = re.compile(
+    r"(?P<reviews>review|what (?:are )?people say(?:ing)?|feedback|opinions)"
+    r"|(?P<compare>compare|difference|better|which one|vs|versus)"
+    r"|(?P<research>details|more info|specifications|specs|tell me about|research)")
+# Checked in this order when several intents appear in one message
+_INTENT_PRIORITY = ("reviews", "compare", "research")
+
+
+@functools.lru_cache(maxsize=2048)
+def _classify_intent(message_lower: str) -> str:
+    """Single-scan intent classification, memoized on the lowered message.
+    Users repeat phrasings like "show reviews" verbatim across turns, so
+    repeats cost one dict probe instead of a regex pass."""
+    found = {m.lastgroup for m in _INTENT_RE.finditer(message_lower)}
+    for intent in _INTENT_PRIORITY:
+        if intent in found:
+            return intent
+    return "search"
+# Single-word quality vocabulary, matched by token-set intersection
+_QUALITY_WORDS = frozenset({"quality", "reliable", "durable", "best", "top", "premium"})
+
+# Refinement vocabularies for handle_followup_query
+_CHEAPER_RE = re.compile(r"cheaper|less expensive|lower price|budget")
+_PRICIER_RE = re.compile(r"more expensive|higher quality|premium|better")
+_BETTER_RATING_RE = re.compile(r"better rating|higher rating|top rated|best reviews")
+_PRIME_RE = re.compile(r"prime|fast shipping|quick delivery")
+_BRAND_RE = re.compile(r'by\s+([A-Za-z]+)')
+
+# Specs worth surfacing per product type in search responses
+_SPEC_KEYS_BY_TYPE = {
+    "laptop": ["Processor", "RAM", "Storage", "Display", "Battery", "Weight"],
+    "phone": ["Display", "Camera", "Battery", "Storage", "RAM"]
+}
+
+# Spec-value extractors for title feature mining (e.g. "16GB ram"),
+# compiled once instead of being rebuilt per feature per product
+_TITLE_FEATURE_RES = {
+    feature: re.compile(
+        rf'(\d+(?:\.\d+)?\s*(?:GB|TB|GHz|inch|hours)?\s*{re.escape(feature)})',
+        re.IGNORECASE)
+    for feature in ("ram", "processor", "ssd", "battery", "display", "screen", "storage")
+}
+
+# Substrings marking a keyword as high-value for search-term construction
+# (specific specs/features); one compiled scan replaces a per-keyword list walk
+_IMPORTANT_KEYWORD_RE = re.compile(
+    r"gb|tb|inch|hz|processor|intel|amd|ryzen|nvidia|wireless|bluetooth"
+    r"|waterproof|rechargeable")
+
+# Format: (compiled pattern, feature name, keyword to add)
+_FEATURE_PATTERNS = [
+    (re.compile(r'with\s+(\d+)\s*GB\s+RAM'), "RAM", "RAM"),
+    (re.compile(r'more\s+RAM'), "RAM", "more RAM"),
+    (re.compile(r'larger\s+screen'), "screen", "larger screen"),
+    (re.compile(r'(\d+)\s*inch'), "screen size", "inch"),
+    (re.compile(r'better\s+battery'), "battery", "long battery"),
+    (re.compile(r'faster'), "performance", "fast"),
+    (re.compile(r'lightweight'), "weight", "lightweight"),
+    (re.compile(r'slim|thin'), "design", "slim"),
+    (re.compile(r'portable'), "portability", "portable")
+]
+
 class ConversationManager:
     """Manages conversation with v2 agentic capabilities and deep product research"""
     def __init__(self, browser_manager: BrowserManager):
@@ -24,12 +115,20 @@ class ConversationManager:
         self.product_researcher = ProductResearcher(browser_manager)
         self.agent = AgentFramework()
         
-        self.conversation_history = []
+        # Bounded so long-running sessions don't grow memory per turn
+        self.conversation_history = deque(maxlen=50)
         self.current_products = []
         self.current_query = {}
         self.current_plan = []
         self.current_step = 0
-        self.researched_products = {}  # Cache for already researched products
+        # Disk-backed so expensive product research survives restarts
+        self.researched_products = ResearchCache(RESEARCH_CACHE_PATH)
+        self._results_cache: OrderedDict = OrderedDict()  # parsed-query hash -> extracted products
+        # Background planner: the plan LLM call runs here while query
+        # parsing and the browser search proceed on the main thread
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self._plan_future = None
+        self._plan_has_research = False  # recomputed whenever a plan lands
     
     def initialize(self):
         """Initialize the conversation and browser"""
@@ -41,20 +140,17 @@ class ConversationManager:
         try:
             self.conversation_history.append({"role": "user", "content": user_message})
             
-            # Determine intent and check if this is a follow-up
-            is_followup = self.is_followup_query(user_message)
-            intent = self._get_intent(user_message)
-            
-            # Direct command handling for better UX
+            # Lowercase once; every classifier below reuses the same copy
             message_lower = user_message.lower()
-            if "compare" in message_lower and "product" in message_lower and len(self.current_products) > 1:
-                return self._compare_products_deeply()
-            elif any(x in message_lower for x in ["review", "what people say"]) and self.current_products:
-                return self._deep_review_analysis()
-            elif any(x in message_lower for x in ["specs", "specifications", "details"]) and self.current_products:
-                return self._research_product(self.current_products[0])
             
-            # Handle specialized intents
+            # Determine intent and check if this is a follow-up
+            is_followup = self.is_followup_query(user_message, message_lower)
+            intent = self._get_intent(user_message, message_lower)
+            
+            # Handle specialized intents. The separate direct-command
+            # scans duplicated these vocabularies against the same
+            # message and dispatched to the same handlers, so the single
+            # memoized classification decides both now.
             if intent == "reviews" and self.current_products:
                 return self._deep_review_analysis()
             elif intent == "compare" and len(self.current_products) > 1:
@@ -62,22 +158,29 @@ class ConversationManager:
             elif intent == "research" and self.current_products:
                 return self._research_product(self.current_products[0])
             elif is_followup:
-                parsed_query = self.handle_followup_query(user_message)
+                parsed_query = self.handle_followup_query(user_message, message_lower)
                 return self._execute_search(parsed_query, is_refinement=True)
             else:
-                # V2: Create a multi-step plan using the agent framework
-                try:
-                    self.current_plan = self.agent.create_plan(user_message, user_id)
-                    logger.info(f"Created plan: {self.current_plan}")
-                except Exception as e:
-                    logger.error(f"Error creating plan: {str(e)}")
-                    self.current_plan = [{"step_number": 1, "action": "search"}]
+                # V2: When the message states its follow-up action outright,
+                # derive the plan statically and skip the planner LLM call;
+                # otherwise kick planning off in the background — it is
+                # network-bound and independent of parsing, so it overlaps
+                # with query parsing and the browser search below and is
+                # collected in _execute_search right before it's consulted
+                fast_plan = self._fast_plan(intent)
+                if fast_plan is not None:
+                    self.current_plan = fast_plan
+                    self._plan_has_research = self._plan_research_flag(fast_plan)
+                    self._plan_future = None
+                else:
+                    self._plan_future = self._executor.submit(
+                        self.agent.create_plan, user_message, user_id)
                 
                 # V2: Use AI for query parsing if available
                 try:
                     if OPENAI_API_KEY:
                         parsed_query = self.agent.parse_query_with_ai(user_message)
-                        logger.info(f"AI parsed query: {parsed_query}")
+                        logger.info("AI parsed query: %s", parsed_query)
                     else:
                         parsed_query = self.query_parser.parse_shopping_query(user_message)
                 except Exception as e:
@@ -90,16 +193,30 @@ class ConversationManager:
             logger.error(f"Process message error: {str(e)}")
             return {"response": f"I encountered an issue: {str(e)}"}
     
-    def _get_intent(self, message: str) -> str:
+    @staticmethod
+    def _fast_plan(intent: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Static plan for messages whose intent words already name the
+        follow-up action, sparing the planner LLM round trip. Returns
+        None for ambiguous messages that still need the planner.
+        """
+        followup_action = {
+            "compare": "compare",
+            "reviews": "analyze_reviews",
+            "research": "research"
+        }.get(intent)
+        if followup_action is None:
+            return None
+        return [
+            {"step_number": 1, "action": "search"},
+            {"step_number": 2, "action": followup_action}
+        ]
+
+    def _get_intent(self, message: str, message_lower: Optional[str] = None) -> str:
         """Get the primary intent from the message"""
-        message = message.lower()
-        if any(term in message for term in ["review", "what are people saying", "feedback", "opinions"]):
-            return "reviews"
-        elif any(term in message for term in ["compare", "difference", "better", "which one", "vs", "versus"]):
-            return "compare"
-        elif any(term in message for term in ["details", "more info", "specifications", "specs", "tell me about", "research"]):
-            return "research"
-        return "search"
+        if message_lower is None:
+            message_lower = message.lower()
+        return _classify_intent(message_lower)
     
     def _execute_search(self, parsed_query: Dict[str, Any], is_refinement: bool = False, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Execute search with product analysis and optional deep research"""
@@ -108,21 +225,43 @@ class ConversationManager:
             initial_response = {"response": "Searching for products that match your criteria...", "is_interim": True}
             logger.info("Executing search with parsed query")
             
-            # Basic search flow
-            search_term = self.construct_search_term(parsed_query)
-            self.amazon_navigator.search_products(search_term)
-            self.apply_filters_from_query(parsed_query)
-            products = self.amazon_navigator.extract_search_results(max_results=5)
+            # Repeat queries with identical filters skip the browser entirely
+            cache_key = self._query_cache_key(parsed_query)
+            cached = self._results_cache.get(cache_key)
+            if cached is not None:
+                self._results_cache.move_to_end(cache_key)
+                logger.info("Results cache hit, skipping search")
+                products = [p.copy() for p in cached]
+            else:
+                # Basic search flow: one navigation with all refinements in
+                # the URL, falling back to the click-based filters if it fails
+                search_term = self.construct_search_term(parsed_query)
+                if not self.amazon_navigator.search_and_filter(search_term, parsed_query):
+                    self.amazon_navigator.search_products(search_term)
+                    self.apply_filters_from_query(parsed_query)
+                products = self.amazon_navigator.extract_search_results(max_results=5)
+
+                if products:
+                    self._results_cache[cache_key] = [p.copy() for p in products]
+                    if len(self._results_cache) > _RESULTS_CACHE_MAX:
+                        self._results_cache.popitem(last=False)
             
-            # Analyze products
+            # Analyze products; ranking also attaches recommendation reasons
             ranked_products = self.product_analyzer.rank_products(products, parsed_query)
             self.current_products = ranked_products
-            
-            # Add recommendations
-            for product in ranked_products:
-                product['recommendation_reason'] = self.product_analyzer.get_recommendation_reason(
-                    product, parsed_query)
-            
+
+            # Collect the speculatively started plan now that the search is
+            # done; its latency was hidden behind the browser work above
+            if self._plan_future is not None:
+                try:
+                    self.current_plan = self._plan_future.result(timeout=10)
+                    logger.info("Created plan: %s", self.current_plan)
+                except Exception as e:
+                    logger.error(f"Error creating plan: {str(e)}")
+                    self.current_plan = [{"step_number": 1, "action": "search"}]
+                self._plan_has_research = self._plan_research_flag(self.current_plan)
+                self._plan_future = None
+
             # V2: Perform deep research on top product if in plan or high-value item
             should_research = self._should_perform_research(parsed_query)
             
@@ -132,12 +271,13 @@ class ConversationManager:
                 top_product['research'] = research_data
                 self.researched_products[top_product.get('link', '')] = research_data
             
-            # V2: Update user preferences
+            # V2: Update user preferences in the background — the dict
+            # churn and write-through persistence don't need to finish
+            # before the user sees the response
             if user_id and ranked_products:
-                for i, product in enumerate(ranked_products[:3]):
-                    # Weight by position (first product gets more weight)
-                    action = "viewed_first" if i == 0 else "viewed"
-                    self.agent.update_preferences(user_id, product, parsed_query, action)
+                self._executor.submit(
+                    self._update_preferences_background, user_id,
+                    [p.copy() for p in ranked_products[:3]], parsed_query)
             
             # V2: Get next actions from plan
             next_actions = self._get_next_actions()
@@ -153,9 +293,9 @@ class ConversationManager:
 
             if products:
                 links_available = sum(1 for p in products if p.get('link'))
-                logger.info(f"Products with valid links: {links_available}/{len(products)}")
+                logger.info("Products with valid links: %d/%d", links_available, len(products))
                 if links_available > 0:
-                    logger.info(f"Sample link: {products[0].get('link', 'None')}")
+                    logger.info("Sample link: %s", products[0].get('link', 'None'))
                         
             return {
                 "response": response,
@@ -166,14 +306,62 @@ class ConversationManager:
             logger.error(f"Search execution error: {str(e)}")
             return {"response": "I'm having trouble searching for these products. Could you try a different search term?"}
     
+    @staticmethod
+    def _append_md(value: Any, parts: List[str], indent: int = 0):
+        """
+        Render an arbitrary comparison fragment as Markdown bullet lines,
+        appending directly into the parts list instead of dumping raw
+        dict/list reprs into the reply.
+        """
+        pad = "  " * indent
+        if isinstance(value, dict):
+            for key, val in value.items():
+                if isinstance(val, (dict, list)):
+                    parts.append(f"{pad}• **{key}**:\n")
+                    ConversationManager._append_md(val, parts, indent + 1)
+                else:
+                    parts.append(f"{pad}• **{key}**: {val}\n")
+        elif isinstance(value, list):
+            for val in value:
+                if isinstance(val, (dict, list)):
+                    ConversationManager._append_md(val, parts, indent)
+                else:
+                    parts.append(f"{pad}• {val}\n")
+        else:
+            parts.append(f"{pad}{value}\n")
+
+    def _update_preferences_background(self, user_id: str,
+                                       products: List[Dict[str, Any]],
+                                       parsed_query: Dict[str, Any]):
+        """Record viewed products off the request path (runs on the pool)"""
+        try:
+            # Weight by position (first product gets more weight); one
+            # batched call persists the profile once for all products
+            interactions = [
+                (product, parsed_query, "viewed_first" if i == 0 else "viewed")
+                for i, product in enumerate(products)
+            ]
+            self.agent.update_preferences_batch(user_id, interactions)
+        except Exception as e:
+            logger.error(f"Background preference update failed: {str(e)}")
+
+    @staticmethod
+    def _query_cache_key(parsed_query: Dict[str, Any]) -> str:
+        """Canonical hash of the query fields that determine the result set"""
+        canonical = json.dumps(parsed_query, sort_keys=True, default=str)
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _plan_research_flag(plan: List[Dict[str, Any]]) -> bool:
+        """Whether a plan contains a research-type step; computed once
+        when the plan lands instead of re-walked per search"""
+        return any(step.get("action") in ("analyze_reviews", "research")
+                   for step in plan)
+
     def _should_perform_research(self, query: Dict[str, Any]) -> bool:
         """Determine if deep product research should be performed"""
-        # Check if it's in our plan
-        research_in_plan = False
-        for step in self.current_plan:
-            if step.get("action") == "analyze_reviews" or step.get("action") == "research":
-                research_in_plan = True
-                break
+        # Precomputed when the plan was assigned
+        research_in_plan = self._plan_has_research
         
         # For high-value items (over $100), always do research
         high_value = False
@@ -181,12 +369,11 @@ class ConversationManager:
         if price_max and price_max > 100:
             high_value = True
         
-        # For items where user explicitly mentioned quality or reliability
-        quality_focus = False
+        # For items where user explicitly mentioned quality or reliability:
+        # tokenize the keywords once and intersect with the vocabulary
         keywords = query.get("keywords", [])
-        quality_terms = ["quality", "reliable", "durable", "best", "top", "premium"]
-        if any(term in ' '.join(keywords).lower() for term in quality_terms):
-            quality_focus = True
+        tokens = {word for keyword in keywords for word in keyword.lower().split()}
+        quality_focus = bool(tokens & _QUALITY_WORDS)
         
         return research_in_plan or high_value or quality_focus
     
@@ -199,35 +386,35 @@ class ConversationManager:
             # Check if we have a valid link
             if not product_link or product_link.startswith(f"{AMAZON_BASE_URL}/s?k="):  # This detects our dummy search links
                 # Provide basic information without review analysis
-                response = f"## Product Information: {product.get('title', 'This Product')}\n\n"
-                response += "I cannot access detailed reviews for this product due to limited data.\n\n"
+                parts = [f"## Product Information: {product.get('title', 'This Product')}\n\n"]
+                parts.append("I cannot access detailed reviews for this product due to limited data.\n\n")
                 
                 # Extract what we can from the title
                 title = product.get('title', '').lower()
                 
                 # Highlight key features we can extract from the title
                 key_features = []
-                for feature in ["ram", "processor", "ssd", "battery", "display", "screen"]:
+                for feature in ("ram", "processor", "ssd", "battery", "display", "screen"):
                     if feature in title:
-                        pattern = rf'(\d+(?:\.\d+)?\s*(?:GB|TB|GHz|inch|hours)?\s*{re.escape(feature)})'
-                        match = re.search(pattern, title, re.IGNORECASE)
+                        match = _TITLE_FEATURE_RES[feature].search(title)
                         if match:
                             key_features.append(match.group(0))
                 
                 if key_features:
-                    response += "### Notable Features\n"
+                    parts.append("### Notable Features\n")
                     for feature in key_features:
-                        response += f"• {feature}\n"
-                    response += "\n"
+                        parts.append(f"• {feature}\n")
+                    parts.append("\n")
                 
                 # Add basic rating info if available
                 if product.get('rating') != "No rating":
-                    response += f"**Rating**: {product.get('rating')}\n\n"
+                    parts.append(f"**Rating**: {product.get('rating')}\n\n")
                 
                 # Add price info
-                response += f"**Price**: {product.get('price', 'Price not available')}\n\n"
+                parts.append(f"**Price**: {product.get('price', 'Price not available')}\n\n")
                 
-                response += "Would you like to try a different search to find products with more detailed information?"
+                parts.append("Would you like to try a different search to find products with more detailed information?")
+                response = "".join(parts)
                 self.conversation_history.append({"role": "assistant", "content": response})
                 
                 return {"response": response}
@@ -238,46 +425,46 @@ class ConversationManager:
                 review_data = research.get("review_analysis", {})
             else:
                 # Navigate to product and perform research
-                logger.info(f"Performing deep review analysis for: {product.get('title', 'unknown product')}")
+                logger.info("Performing deep review analysis for: %s", product.get('title', 'unknown product'))
                 research = self.product_researcher.research_product(product)
                 review_data = research.get("review_analysis", {})
                 self.researched_products[product_link] = research
             
             # Format enhanced review response
-            response = f"## In-depth Review Analysis: {product.get('title', 'This Product')}\n\n"
+            parts = [f"## In-depth Review Analysis: {product.get('title', 'This Product')}\n\n"]
             
             if "sentiment" in review_data:
-                response += f"**Overall Sentiment**: {review_data['sentiment']}\n\n"
+                parts.append(f"**Overall Sentiment**: {review_data['sentiment']}\n\n")
             
             if "strengths" in review_data and review_data["strengths"]:
-                response += "### Key Strengths\n"
+                parts.append("### Key Strengths\n")
                 for strength in review_data["strengths"]:
-                    response += f"✅ {strength}\n"
-                response += "\n"
+                    parts.append(f"✅ {strength}\n")
+                parts.append("\n")
             
             if "concerns" in review_data and review_data["concerns"]:
-                response += "### Common Concerns\n"
+                parts.append("### Common Concerns\n")
                 for concern in review_data["concerns"]:
-                    response += f"⚠️ {concern}\n"
-                response += "\n"
+                    parts.append(f"⚠️ {concern}\n")
+                parts.append("\n")
             
             if "longevity" in review_data and review_data["longevity"] != "unknown":
-                response += f"**Durability Assessment**: {review_data['longevity']}\n\n"
+                parts.append(f"**Durability Assessment**: {review_data['longevity']}\n\n")
             
             if "common_themes" in review_data and review_data["common_themes"]:
-                response += "### Common Themes in Reviews\n"
+                parts.append("### Common Themes in Reviews\n")
                 for theme in review_data["common_themes"]:
-                    response += f"• {theme}\n"
-                response += "\n"
+                    parts.append(f"• {theme}\n")
+                parts.append("\n")
             
             if "customer_service" in review_data and review_data["customer_service"]:
-                response += f"**Customer Service**: {review_data['customer_service']}\n\n"
+                parts.append(f"**Customer Service**: {review_data['customer_service']}\n\n")
             
             if "competitor_mentions" in review_data and review_data["competitor_mentions"]:
-                response += "### Compared To\n"
+                parts.append("### Compared To\n")
                 for competitor in review_data["competitor_mentions"]:
-                    response += f"• {competitor}\n"
-                response += "\n"
+                    parts.append(f"• {competitor}\n")
+                parts.append("\n")
             
             # Add pros and cons summary
             if "pros_cons" in research:
@@ -285,23 +472,24 @@ class ConversationManager:
                 cons = research["pros_cons"].get("cons", [])
                 
                 if pros:
-                    response += "### Pros\n"
+                    parts.append("### Pros\n")
                     for pro in pros:
-                        response += f"👍 {pro}\n"
-                    response += "\n"
+                        parts.append(f"👍 {pro}\n")
+                    parts.append("\n")
                 
                 if cons:
-                    response += "### Cons\n"
+                    parts.append("### Cons\n")
                     for con in cons:
-                        response += f"👎 {con}\n"
-                    response += "\n"
+                        parts.append(f"👎 {con}\n")
+                    parts.append("\n")
             
             # Add verification info
             verified = review_data.get("verified_purchases", 0)
             if verified:
-                response += f"*Based on {verified} verified purchase reviews*\n\n"
+                parts.append(f"*Based on {verified} verified purchase reviews*\n\n")
             
-            response += "Would you like to compare with other products or learn more about specific aspects?"
+            parts.append("Would you like to compare with other products or learn more about specific aspects?")
+            response = "".join(parts)
             self.conversation_history.append({"role": "assistant", "content": response})
             
             return {"response": response, "research": research}
@@ -318,18 +506,17 @@ class ConversationManager:
             # Check if we have a valid link
             if not product_link or product_link.startswith(f"{AMAZON_BASE_URL}/s?k="):  # This detects our dummy search links
                 # Provide basic information without detailed research
-                response = f"## Product Information: {product.get('title', 'This Product')}\n\n"
-                response += "I cannot access detailed specifications for this product due to limited data.\n\n"
+                parts = [f"## Product Information: {product.get('title', 'This Product')}\n\n"]
+                parts.append("I cannot access detailed specifications for this product due to limited data.\n\n")
                 
                 # Extract what we can from the title
                 title = product.get('title', '').lower()
                 
                 # Highlight key features we can extract from the title
                 key_features = []
-                for feature in ["ram", "processor", "ssd", "battery", "display", "screen", "storage"]:
+                for feature in ("ram", "processor", "ssd", "battery", "display", "screen", "storage"):
                     if feature in title:
-                        pattern = rf'(\d+(?:\.\d+)?\s*(?:GB|TB|GHz|inch|hours)?\s*{re.escape(feature)})'
-                        match = re.search(pattern, title, re.IGNORECASE)
+                        match = _TITLE_FEATURE_RES[feature].search(title)
                         if match:
                             key_features.append(match.group(0))
                 
@@ -339,28 +526,29 @@ class ConversationManager:
                     key_features.append(f"Processor: {processor_match.group(1)}")
                 
                 if key_features:
-                    response += "### Specifications\n"
+                    parts.append("### Specifications\n")
                     for feature in key_features:
-                        response += f"• {feature}\n"
-                    response += "\n"
+                        parts.append(f"• {feature}\n")
+                    parts.append("\n")
                 
                 # Add basic rating info if available
                 if product.get('rating') != "No rating":
-                    response += f"**Rating**: {product.get('rating')}"
+                    parts.append(f"**Rating**: {product.get('rating')}")
                     
                     review_count = product.get('review_count', 0)
                     if review_count:
-                        response += f" ({review_count} reviews)\n\n"
+                        parts.append(f" ({review_count} reviews)\n\n")
                     else:
-                        response += "\n\n"
+                        parts.append("\n\n")
                 
                 # Add price info
-                response += f"**Price**: {product.get('price', 'Price not available')}\n\n"
+                parts.append(f"**Price**: {product.get('price', 'Price not available')}\n\n")
                 
                 # Add shipping info
-                response += f"**Shipping**: {'✓ Prime shipping available' if product.get('has_prime', False) else 'Standard shipping'}\n\n"
+                parts.append(f"**Shipping**: {'✓ Prime shipping available' if product.get('has_prime', False) else 'Standard shipping'}\n\n")
                 
-                response += "Would you like to try a different search to find products with more detailed information?"
+                parts.append("Would you like to try a different search to find products with more detailed information?")
+                response = "".join(parts)
                 self.conversation_history.append({"role": "assistant", "content": response})
                 
                 return {"response": response}
@@ -370,31 +558,31 @@ class ConversationManager:
                 research = self.researched_products[product_link]
             else:
                 # Perform new research
-                logger.info(f"Researching product details for: {product.get('title', 'unknown product')}")
+                logger.info("Researching product details for: %s", product.get('title', 'unknown product'))
                 research = self.product_researcher.research_product(product)
                 self.researched_products[product_link] = research
             
             # Format comprehensive product details
-            response = f"## Detailed Analysis: {product.get('title', 'This Product')}\n\n"
+            parts = [f"## Detailed Analysis: {product.get('title', 'This Product')}\n\n"]
             
             # Add specifications
             specs = research.get("specifications", {})
             if specs:
-                response += "### Key Specifications\n"
-                for key, value in list(specs.items())[:8]:  # Limit to top 8 specs
-                    response += f"• **{key}**: {value}\n"
-                response += "\n"
+                parts.append("### Key Specifications\n")
+                for key, value in islice(specs.items(), 8):  # Limit to top 8 specs
+                    parts.append(f"• **{key}**: {value}\n")
+                parts.append("\n")
             
             # Add description summary
             description = research.get("detailed_description", "")
             if description:
                 # Summarize if too long
                 if len(description) > 300:
-                    response += "### Product Description\n"
-                    response += description[:300] + "...\n\n"
+                    parts.append("### Product Description\n")
+                    parts.append(description[:300] + "...\n\n")
                 else:
-                    response += "### Product Description\n"
-                    response += description + "\n\n"
+                    parts.append("### Product Description\n")
+                    parts.append(description + "\n\n")
             
             # Add pros and cons
             pros_cons = research.get("pros_cons", {})
@@ -402,35 +590,36 @@ class ConversationManager:
             cons = pros_cons.get("cons", [])
             
             if pros:
-                response += "### Pros\n"
+                parts.append("### Pros\n")
                 for pro in pros:
-                    response += f"👍 {pro}\n"
-                response += "\n"
+                    parts.append(f"👍 {pro}\n")
+                parts.append("\n")
             
             if cons:
-                response += "### Cons\n"
+                parts.append("### Cons\n")
                 for con in cons:
-                    response += f"👎 {con}\n"
-                response += "\n"
+                    parts.append(f"👎 {con}\n")
+                parts.append("\n")
             
             # Add review summary
             review_data = research.get("review_analysis", {})
             if review_data:
-                response += "### What Customers Say\n"
+                parts.append("### What Customers Say\n")
                 if "sentiment" in review_data:
-                    response += f"**Overall Sentiment**: {review_data['sentiment']}\n"
+                    parts.append(f"**Overall Sentiment**: {review_data['sentiment']}\n")
                 
                 if "strengths" in review_data and review_data["strengths"]:
                     top_strengths = ', '.join(review_data["strengths"][:3])
-                    response += f"**Top Strengths**: {top_strengths}\n"
+                    parts.append(f"**Top Strengths**: {top_strengths}\n")
                 
                 if "concerns" in review_data and review_data["concerns"]:
                     top_concerns = ', '.join(review_data["concerns"][:3])
-                    response += f"**Top Concerns**: {top_concerns}\n"
+                    parts.append(f"**Top Concerns**: {top_concerns}\n")
                 
-                response += "\n"
+                parts.append("\n")
             
-            response += "Would you like to compare with other products or see full review details?"
+            parts.append("Would you like to compare with other products or see full review details?")
+            response = "".join(parts)
             self.conversation_history.append({"role": "assistant", "content": response})
             
             return {"response": response, "research": research}
@@ -452,39 +641,38 @@ class ConversationManager:
                 logger.warning(f"Not enough products with valid links. Creating basic comparison.")
                 
                 # Format basic comparison response
-                response = "## Product Comparison\n\n"
-                response += "I can provide a basic comparison based on the available product information:\n\n"
+                parts = ["## Product Comparison\n\n"]
+                parts.append("I can provide a basic comparison based on the available product information:\n\n")
                 
                 # Compare key attributes
                 for i, product in enumerate(products, 1):
-                    response += f"### {i}. {product.get('title', 'Unknown product')}\n"
-                    response += f"* **Price**: {product.get('price', 'Price not available')}\n"
-                    response += f"* **Rating**: {product.get('rating', 'No rating')}"
+                    parts.append(f"### {i}. {product.get('title', 'Unknown product')}\n")
+                    parts.append(f"* **Price**: {product.get('price', 'Price not available')}\n")
+                    parts.append(f"* **Rating**: {product.get('rating', 'No rating')}")
                     
                     review_count = product.get('review_count', 0)
                     if review_count:
-                        response += f" ({review_count} reviews)\n"
+                        parts.append(f" ({review_count} reviews)\n")
                     else:
-                        response += "\n"
+                        parts.append("\n")
                     
                     # Extract key features from title
                     key_features = []
                     title = product.get('title', '').lower()
-                    for feature in ["ram", "processor", "ssd", "battery", "display", "screen"]:
+                    for feature in ("ram", "processor", "ssd", "battery", "display", "screen"):
                         if feature in title:
-                            pattern = rf'(\d+(?:\.\d+)?\s*(?:GB|TB|GHz|inch|hours)?\s*{re.escape(feature)})'
-                            match = re.search(pattern, title, re.IGNORECASE)
+                            match = _TITLE_FEATURE_RES[feature].search(title)
                             if match:
                                 key_features.append(match.group(0))
                     
                     if key_features:
-                        response += f"* **Features**: {', '.join(key_features)}\n"
+                        parts.append(f"* **Features**: {', '.join(key_features)}\n")
                     
-                    response += f"* {'✓ Prime shipping' if product.get('has_prime', False) else 'Standard shipping'}\n\n"
+                    parts.append(f"* {'✓ Prime shipping' if product.get('has_prime', False) else 'Standard shipping'}\n\n")
                 
                 # Add a simple comparison table of key specs
-                response += "### Key Specifications Comparison\n\n"
-                response += "| Feature | "
+                parts.append("### Key Specifications Comparison\n\n")
+                parts.append("| Feature | ")
                 
                 # Add product names to the table header
                 for i, product in enumerate(products, 1):
@@ -492,58 +680,59 @@ class ConversationManager:
                     # Truncate long titles
                     if len(title) > 20:
                         title = title[:17] + "..."
-                    response += f"{title} | "
-                response += "\n"
+                    parts.append(f"{title} | ")
+                parts.append("\n")
                 
                 # Add separator row
-                response += "| --- | " + " --- |" * len(products) + "\n"
+                parts.append("| --- | " + " --- |" * len(products) + "\n")
                 
                 # Add price row
-                response += "| Price | "
+                parts.append("| Price | ")
                 for product in products:
-                    response += f"{product.get('price', 'N/A')} | "
-                response += "\n"
+                    parts.append(f"{product.get('price', 'N/A')} | ")
+                parts.append("\n")
                 
                 # Add rating row
-                response += "| Rating | "
+                parts.append("| Rating | ")
                 for product in products:
-                    response += f"{product.get('rating', 'N/A')} | "
-                response += "\n"
+                    parts.append(f"{product.get('rating', 'N/A')} | ")
+                parts.append("\n")
                 
                 # Add RAM row if applicable
                 if any("ram" in product.get('title', '').lower() for product in products):
-                    response += "| RAM | "
+                    parts.append("| RAM | ")
                     for product in products:
                         title = product.get('title', '').lower()
                         ram_match = re.search(r'(\d+\s*gb\s*ram)', title)
                         ram = ram_match.group(1) if ram_match else "N/A"
-                        response += f"{ram} | "
-                    response += "\n"
+                        parts.append(f"{ram} | ")
+                    parts.append("\n")
                 
                 # Add Storage row if applicable
                 if any(storage_term in product.get('title', '').lower() for product in products for storage_term in ["ssd", "emmc", "storage"]):
-                    response += "| Storage | "
+                    parts.append("| Storage | ")
                     for product in products:
                         title = product.get('title', '').lower()
                         storage_match = re.search(r'(\d+\s*(?:gb|tb)\s*(?:ssd|emmc|storage))', title)
                         storage = storage_match.group(1) if storage_match else "N/A"
-                        response += f"{storage} | "
-                    response += "\n"
+                        parts.append(f"{storage} | ")
+                    parts.append("\n")
                 
                 # Add processor row if applicable
                 if any(processor_term in product.get('title', '').lower() for product in products for processor_term in ["processor", "intel", "amd", "celeron", "core"]):
-                    response += "| Processor | "
+                    parts.append("| Processor | ")
                     for product in products:
                         title = product.get('title', '').lower()
                         # Try to extract processor info with a more flexible pattern
                         processor_match = re.search(r'((?:intel|amd|ryzen|celeron|core)\s+[^\s,]+(?:\s+[^\s,]+)?)', title, re.IGNORECASE)
                         processor = processor_match.group(1) if processor_match else "N/A"
-                        response += f"{processor} | "
-                    response += "\n"
+                        parts.append(f"{processor} | ")
+                    parts.append("\n")
                 
-                response += "\nFor a more detailed comparison with in-depth specifications and review analysis, I would need to access the product pages directly.\n"
-                response += "Would you like to see information about a specific product or try a different search?"
+                parts.append("\nFor a more detailed comparison with in-depth specifications and review analysis, I would need to access the product pages directly.\n")
+                parts.append("Would you like to see information about a specific product or try a different search?")
                 
+                response = "".join(parts)
                 self.conversation_history.append({"role": "assistant", "content": response})
                 return {"response": response}
             
@@ -560,12 +749,11 @@ class ConversationManager:
                     research = self.researched_products[product_link]
                 else:
                     # Perform new research
-                    logger.info(f"Researching for comparison: {product.get('title', 'unknown product')}")
+                    logger.info("Researching for comparison: %s", product.get('title', 'unknown product'))
                     research = self.product_researcher.research_product(product)
                     self.researched_products[product_link] = research
                 
-                researched_products.append(product.copy())
-                researched_products[-1]['research'] = research
+                researched_products.append({**product, 'research': research})
             
             if len(researched_products) < 2:
                 return {"response": "I need at least two products with valid links to compare. Please try a different search."}
@@ -574,7 +762,7 @@ class ConversationManager:
             comparison = self.product_researcher.compare_multiple_products(researched_products)
             
             # Format enhanced comparison response
-            response = "## Product Comparison Analysis\n\n"
+            parts = ["## Product Comparison Analysis\n\n"]
             
             # Best choice recommendation
             if "best_choice" in comparison:
@@ -585,14 +773,14 @@ class ConversationManager:
                 
                 if 0 <= best_idx < len(researched_products):
                     best_product = researched_products[best_idx]
-                    response += f"### 🏆 Best Overall Choice: {best_product.get('title', 'Product ' + str(best_idx+1))}\n"
+                    parts.append(f"### 🏆 Best Overall Choice: {best_product.get('title', 'Product ' + str(best_idx+1))}\n")
                     
                     if isinstance(best_choice, dict) and "reason" in best_choice:
-                        response += f"*{best_choice.get('reason', '')}*\n\n"
+                        parts.append(f"*{best_choice.get('reason', '')}*\n\n")
                     elif isinstance(best_choice, str):
-                        response += f"*{best_choice}*\n\n"
+                        parts.append(f"*{best_choice}*\n\n")
                     else:
-                        response += "\n"
+                        parts.append("\n")
             
             # Best value recommendation
             if "best_value" in comparison:
@@ -603,18 +791,18 @@ class ConversationManager:
                 
                 if 0 <= value_idx < len(researched_products):
                     value_product = researched_products[value_idx]
-                    response += f"### 💰 Best Value Choice: {value_product.get('title', 'Product ' + str(value_idx+1))}\n"
+                    parts.append(f"### 💰 Best Value Choice: {value_product.get('title', 'Product ' + str(value_idx+1))}\n")
                     
                     if isinstance(value_choice, dict) and "reason" in value_choice:
-                        response += f"*{value_choice.get('reason', '')}*\n\n"
+                        parts.append(f"*{value_choice.get('reason', '')}*\n\n")
                     elif isinstance(value_choice, str):
-                        response += f"*{value_choice}*\n\n"
+                        parts.append(f"*{value_choice}*\n\n")
                     else:
-                        response += "\n"
+                        parts.append("\n")
             
             # Feature comparison
             if "feature_comparison" in comparison and comparison["feature_comparison"]:
-                response += "### Feature Comparison\n"
+                parts.append("### Feature Comparison\n")
                 
                 if isinstance(comparison["feature_comparison"], list):
                     for feature in comparison["feature_comparison"]:
@@ -630,15 +818,15 @@ class ConversationManager:
                                 # Shorten title if too long
                                 if len(winner_name) > 30:
                                     winner_name = winner_name[:27] + "..."
-                                response += f"• **{feature_name}**: {winner_name} wins\n"
+                                parts.append(f"• **{feature_name}**: {winner_name} wins\n")
                 else:
-                    response += str(comparison["feature_comparison"]) + "\n"
+                    self._append_md(comparison["feature_comparison"], parts)
                     
-                response += "\n"
+                parts.append("\n")
             
             # Reliability comparison
             if "reliability_comparison" in comparison:
-                response += "### Reliability Assessment\n"
+                parts.append("### Reliability Assessment\n")
                 if isinstance(comparison["reliability_comparison"], dict):
                     for product_idx, reliability in comparison["reliability_comparison"].items():
                         try:
@@ -647,16 +835,17 @@ class ConversationManager:
                                 product_title = researched_products[idx].get('title')
                                 if len(product_title) > 30:
                                     product_title = product_title[:27] + "..."
-                                response += f"• **{product_title}**: {reliability}\n"
+                                parts.append(f"• **{product_title}**: {reliability}\n")
                         except:
                             pass
-                    response += "\n"
+                    parts.append("\n")
                 else:
-                    response += str(comparison["reliability_comparison"]) + "\n\n"
+                    self._append_md(comparison["reliability_comparison"], parts)
+                    parts.append("\n")
             
             # Price analysis
             if "price_analysis" in comparison:
-                response += "### Price-to-Value Analysis\n"
+                parts.append("### Price-to-Value Analysis\n")
                 if isinstance(comparison["price_analysis"], dict):
                     for product_idx, analysis in comparison["price_analysis"].items():
                         try:
@@ -665,16 +854,17 @@ class ConversationManager:
                                 product_title = researched_products[idx].get('title')
                                 if len(product_title) > 30:
                                     product_title = product_title[:27] + "..."
-                                response += f"• **{product_title}**: {analysis}\n"
+                                parts.append(f"• **{product_title}**: {analysis}\n")
                         except:
                             pass
-                    response += "\n"
+                    parts.append("\n")
                 else:
-                    response += str(comparison["price_analysis"]) + "\n\n"
+                    self._append_md(comparison["price_analysis"], parts)
+                    parts.append("\n")
             
             # User recommendation
             if "recommendation" in comparison:
-                response += "### Best For Different Users\n"
+                parts.append("### Best For Different Users\n")
                 if isinstance(comparison["recommendation"], dict):
                     for user_type, product_idx in comparison["recommendation"].items():
                         try:
@@ -683,15 +873,16 @@ class ConversationManager:
                                 product_title = researched_products[idx].get('title')
                                 if len(product_title) > 30:
                                     product_title = product_title[:27] + "..."
-                                response += f"• **{user_type}**: {product_title}\n"
+                                parts.append(f"• **{user_type}**: {product_title}\n")
                         except:
                             pass
-                    response += "\n"
+                    parts.append("\n")
                 else:
-                    response += str(comparison["recommendation"]) + "\n\n"
+                    self._append_md(comparison["recommendation"], parts)
+                    parts.append("\n")
             
             # Summary
-            response += "### Summary\n"
+            parts.append("### Summary\n")
             for i, product in enumerate(researched_products):
                 product_title = product.get('title', f'Product {i+1}')
                 # Shorten title if too long
@@ -702,15 +893,16 @@ class ConversationManager:
                 pros = research.get('pros_cons', {}).get('pros', [])
                 cons = research.get('pros_cons', {}).get('cons', [])
                 
-                response += f"**{product_title}**\n"
+                parts.append(f"**{product_title}**\n")
                 if pros:
-                    response += f"*Pros*: {', '.join(pros[:2])}\n"
+                    parts.append(f"*Pros*: {', '.join(pros[:2])}\n")
                 if cons:
-                    response += f"*Cons*: {', '.join(cons[:2])}\n"
+                    parts.append(f"*Cons*: {', '.join(cons[:2])}\n")
                     
-                response += "\n"
+                parts.append("\n")
             
-            response += "Would you like more details about any specific product or aspect?"
+            parts.append("Would you like more details about any specific product or aspect?")
+            response = "".join(parts)
             self.conversation_history.append({"role": "assistant", "content": response})
             
             return {"response": response, "comparison": comparison}
@@ -721,35 +913,40 @@ class ConversationManager:
     
     def _get_next_actions(self) -> List[str]:
         """Get next steps from plan and context"""
+        # Ordered list plus a seen-set so dedup stays O(1) per action
         actions = []
-        
+        seen = set()
+
+        def add_action(action: str):
+            if action not in seen:
+                seen.add(action)
+                actions.append(action)
+
         # Check plan for next steps
         if self.current_plan and self.current_step < len(self.current_plan):
             next_step = self.current_plan[self.current_step]
             self.current_step += 1
-            
+
             action = next_step.get("action", "")
             if action == "analyze_reviews":
-                actions.append("Read in-depth review analysis")
+                add_action("Read in-depth review analysis")
             elif action == "compare":
-                actions.append("Compare top products")
+                add_action("Compare top products")
             elif action == "research":
-                actions.append("See detailed product specifications")
+                add_action("See detailed product specifications")
             elif action == "filter":
-                actions.append("Refine your search")
+                add_action("Refine your search")
             elif action == "recommend":
-                actions.append("Get my final recommendation")
-        
+                add_action("Get my final recommendation")
+
         # Add default actions based on context
-        if len(self.current_products) > 1 and "Compare top products" not in actions:
-            actions.append("Compare top products")
-        
-        if "Read in-depth review analysis" not in actions and self.current_products:
-            actions.append("Read in-depth review analysis")
-            
-        if "See detailed product specifications" not in actions and self.current_products:
-            actions.append("See detailed product specifications")
-            
+        if len(self.current_products) > 1:
+            add_action("Compare top products")
+
+        if self.current_products:
+            add_action("Read in-depth review analysis")
+            add_action("See detailed product specifications")
+
         return actions
     
     def _format_search_response(self, products: List[Dict], parsed_query: Dict, 
@@ -768,19 +965,29 @@ class ConversationManager:
         
         response_parts = [intro]
         
-        # Add top products with enhanced details
+        # The product type doesn't change per product, so resolve the
+        # spec-key list for it once outside the loop
+        product_type = parsed_query.get("product_type", "").lower()
+        if "laptop" in product_type:
+            type_spec_keys = _SPEC_KEYS_BY_TYPE["laptop"]
+        elif "phone" in product_type:
+            type_spec_keys = _SPEC_KEYS_BY_TYPE["phone"]
+        else:
+            type_spec_keys = None
+        
+        # Add top products with enhanced details; each block accumulates
+        # in a list and joins once instead of reallocating per +=
         for i, product in enumerate(products[:3], 1):
-            product_details = f"\n### {i}. {product.get('title', 'Unknown product')}\n"
-            product_details += f"* **Price**: {product.get('price', 'Price not available')}\n"
-            product_details += f"* **Rating**: {product.get('rating', 'No ratings')}"
-            
+            detail_parts = [
+                f"\n### {i}. {product.get('title', 'Unknown product')}\n",
+                f"* **Price**: {product.get('price', 'Price not available')}\n",
+                f"* **Rating**: {product.get('rating', 'No ratings')}"
+            ]
+
             # Add review count if available
             review_count = product.get('review_count', 0)
-            if review_count:
-                product_details += f" ({review_count} reviews)\n"
-            else:
-                product_details += "\n"
-            
+            detail_parts.append(f" ({review_count} reviews)\n" if review_count else "\n")
+
             # V2: Add enhanced features extraction
             if 'research' in product:
                 # Use researched specifications
@@ -788,52 +995,45 @@ class ConversationManager:
                 if specs:
                     important_specs = []
                     # Focus on key specs based on product type
-                    product_type = parsed_query.get("product_type", "").lower()
-                    if "laptop" in product_type:
-                        keys_to_check = ["Processor", "RAM", "Storage", "Display", "Battery", "Weight"]
-                    elif "phone" in product_type:
-                        keys_to_check = ["Display", "Camera", "Battery", "Storage", "RAM"]
-                    else:
-                        keys_to_check = list(specs.keys())
-                    
+                    keys_to_check = type_spec_keys if type_spec_keys is not None else specs.keys()
+
                     for key in keys_to_check:
                         if key in specs:
                             important_specs.append(f"**{key}**: {specs[key]}")
-                    
+
                     if important_specs:
-                        product_details += f"* **Specs**: {' | '.join(important_specs[:3])}\n"
+                        detail_parts.append(f"* **Specs**: {' | '.join(important_specs[:3])}\n")
             else:
                 # Extract features from title
                 key_features = []
                 title = product.get('title', '').lower()
-                for feature in ["ram", "processor", "ssd", "battery", "display", "screen"]:
+                for feature in ("ram", "processor", "ssd", "battery", "display", "screen"):
                     if feature in title:
-                        pattern = rf'(\d+(?:\.\d+)?\s*(?:GB|TB|GHz|inch|hours)?\s*{re.escape(feature)})'
-                        match = re.search(pattern, title, re.IGNORECASE)
+                        match = _TITLE_FEATURE_RES[feature].search(title)
                         if match:
                             key_features.append(match.group(0))
-                
+
                 if key_features:
-                    product_details += f"* **Features**: {', '.join(key_features)}\n"
-                
+                    detail_parts.append(f"* **Features**: {', '.join(key_features)}\n")
+
             # Add shipping info
-            product_details += f"* {'✓ Prime shipping' if product.get('has_prime', False) else 'Standard shipping'}\n"
-            
+            detail_parts.append(f"* {'✓ Prime shipping' if product.get('has_prime', False) else 'Standard shipping'}\n")
+
             # Add recommendation reason
             if product.get('recommendation_reason'):
-                product_details += f"* **Why this product**: {product['recommendation_reason']}\n"
-            
+                detail_parts.append(f"* **Why this product**: {product['recommendation_reason']}\n")
+
             # Add pros/cons if available from research
             if 'research' in product and 'pros_cons' in product['research']:
                 pros = product['research']['pros_cons'].get('pros', [])
                 cons = product['research']['pros_cons'].get('cons', [])
-                
+
                 if pros:
-                    product_details += f"* **Top Pro**: {pros[0]}\n"
+                    detail_parts.append(f"* **Top Pro**: {pros[0]}\n")
                 if cons:
-                    product_details += f"* **Note**: {cons[0]}\n"
-            
-            response_parts.append(product_details)
+                    detail_parts.append(f"* **Note**: {cons[0]}\n")
+
+            response_parts.append("".join(detail_parts))
         
         # V2: Add refinement suggestions with more context
         if refinement_suggestions:
@@ -849,61 +1049,41 @@ class ConversationManager:
         
         return "\n".join(response_parts)
     
-    def is_followup_query(self, message: str) -> bool:
+    def is_followup_query(self, message: str, message_lower: Optional[str] = None) -> bool:
         """Enhanced follow-up detection with better context awareness"""
         if len(self.conversation_history) < 2:
             return False
             
-        # Direct commands that should be treated as follow-ups when products exist
-        direct_commands = [
-            "compare", "compare products", "compare top products", 
-            "reviews", "read reviews", "read in-depth review analysis",
-            "details", "specifications", "specs", "see detailed product specifications",
-            "tell me more", "more information", "learn more"
-        ]
-        
-        message_lower = message.lower()
-        
+        if message_lower is None:
+            message_lower = message.lower()
+
         # Check if this is a direct command and we have products
-        if self.current_products and any(cmd in message_lower for cmd in direct_commands):
+        if self.current_products and _DIRECT_COMMAND_RE.search(message_lower):
             return True
-            
-        # Original follow-up detection logic
-        followup_phrases = [
-            "show me", "more details", "cheaper", "better",
-            "what about", "how about", "features", "price", "shipping"
-        ]
-        
-        # Check for short queries that reference previous context
-        is_short_query = len(message.split()) < 5
-        has_pronoun_reference = any(term in message_lower for term in ["it", "this", "that", "these", "those", "they"])
-        
-        # Check for product number references (e.g., "show me #2")
-        has_product_reference = bool(re.search(r'#?\d+', message_lower))
-        
-        # Check for command-like queries without clear product type
-        is_command_without_product = (
-            any(term in message_lower for term in ["show", "get", "tell", "find"]) and
-            is_short_query and
-            not any(term in message_lower for term in ["product", "item", "laptop", "phone"])
-        )
-        
-        # Check for explicit follow-up phrases
-        has_followup_phrase = any(phrase in message_lower for phrase in followup_phrases)
-        
-        return (
-            (is_short_query and (has_pronoun_reference or has_product_reference)) or
-            is_command_without_product or
-            has_followup_phrase
-        )
+
+        # Cheapest and most discriminative test first: short queries that
+        # reference previous context. Counting spaces approximates the word
+        # count without allocating a split list.
+        is_short_query = message_lower.count(' ') + 1 < 5
+        if is_short_query:
+            if _PRONOUN_RE.search(message_lower) or _PRODUCT_NUM_RE.search(message_lower):
+                return True
+            # Command-like queries without a clear product type
+            if (_COMMAND_VERB_RE.search(message_lower) and
+                    not _PRODUCT_NOUN_RE.search(message_lower)):
+                return True
+
+        # Only longer, ambiguous messages reach the phrase scan
+        return bool(_FOLLOWUP_PHRASE_RE.search(message_lower))
     
-    def handle_followup_query(self, message: str) -> Dict[str, Any]:
+    def handle_followup_query(self, message: str, message_lower: Optional[str] = None) -> Dict[str, Any]:
         """Enhanced follow-up handling with better understanding of refinements"""
         modified_query = self.current_query.copy()
-        message_lower = message.lower()
+        if message_lower is None:
+            message_lower = message.lower()
         
         # Check for specific product selection by number
-        product_num_match = re.search(r'#?(\d+)', message_lower)
+        product_num_match = _PRODUCT_NUM_RE.search(message_lower)
         if product_num_match:
             product_num = int(product_num_match.group(1))
             if 1 <= product_num <= len(self.current_products):
@@ -920,7 +1100,7 @@ class ConversationManager:
                     return self._research_product(selected_product)
         
         # Price refinements
-        if any(term in message_lower for term in ["cheaper", "less expensive", "lower price", "budget"]):
+        if _CHEAPER_RE.search(message_lower):
             current_max = modified_query.get("price_range", {}).get("max")
             if current_max:
                 # Reduce by 20% or $100, whichever is less
@@ -929,7 +1109,7 @@ class ConversationManager:
                 if "price_range" not in modified_query:
                     modified_query["price_range"] = {}
                 modified_query["price_range"]["max"] = new_max
-        elif any(term in message_lower for term in ["more expensive", "higher quality", "premium", "better"]):
+        elif _PRICIER_RE.search(message_lower):
             current_min = modified_query.get("price_range", {}).get("min", 0)
             # Increase the minimum price to focus on higher-end products
             if "price_range" not in modified_query:
@@ -937,109 +1117,106 @@ class ConversationManager:
             modified_query["price_range"]["min"] = current_min + 100
         
         # Quality refinements
-        if any(term in message_lower for term in ["better rating", "higher rating", "top rated", "best reviews"]):
+        if _BETTER_RATING_RE.search(message_lower):
             # Increase minimum rating
             modified_query["rating_min"] = 4
             modified_query["exact_rating_min"] = 4.5
         
-        # Feature refinements
-        feature_patterns = [
-            # Format: (regex pattern, feature name, keyword to add)
-            (r'with\s+(\d+)\s*GB\s+RAM', "RAM", "RAM"),
-            (r'more\s+RAM', "RAM", "more RAM"),
-            (r'larger\s+screen', "screen", "larger screen"),
-            (r'(\d+)\s*inch', "screen size", "inch"),
-            (r'better\s+battery', "battery", "long battery"),
-            (r'faster', "performance", "fast"),
-            (r'lightweight', "weight", "lightweight"),
-            (r'slim|thin', "design", "slim"),
-            (r'portable', "portability", "portable")
-        ]
-        
-        for pattern, feature_name, keyword in feature_patterns:
-            if re.search(pattern, message_lower):
-                # Add the feature to keywords
-                if "keywords" not in modified_query:
-                    modified_query["keywords"] = []
-                if keyword not in modified_query["keywords"]:
-                    modified_query["keywords"].append(keyword)
-        
+        # Feature refinements: collect additions, then dedup in one
+        # order-preserving pass. Copying also keeps the append from
+        # mutating the keyword list shared with the previous query.
+        keywords = list(modified_query.get("keywords", []))
+        for pattern, feature_name, keyword in _FEATURE_PATTERNS:
+            if pattern.search(message_lower):
+                keywords.append(keyword)
+
         # Shipping preference refinements
-        if "prime" in message_lower or "fast shipping" in message_lower or "quick delivery" in message_lower:
+        if _PRIME_RE.search(message_lower):
             modified_query["prime_shipping"] = True
-        
+
         # Brand refinements
-        brand_match = re.search(r'by\s+([A-Za-z]+)', message_lower)
+        brand_match = _BRAND_RE.search(message_lower)
         if brand_match:
-            brand = brand_match.group(1).capitalize()
-            if "keywords" not in modified_query:
-                modified_query["keywords"] = []
-            modified_query["keywords"].append(brand)
-        
+            keywords.append(brand_match.group(1).capitalize())
+
+        if keywords:
+            modified_query["keywords"] = list(dict.fromkeys(keywords))
+
         return modified_query
     
     def construct_search_term(self, parsed_query: Dict[str, Any]) -> str:
         """Construct an optimized search term from parsed query"""
+        # Token-level dedup: O(1) set probes instead of rejoining the
+        # component string per keyword, and no substring false positives
         components = []
-        
+        seen_tokens = set()
+
+        def add_component(term: str):
+            tokens = term.lower().split()
+            if any(token not in seen_tokens for token in tokens):
+                components.append(term)
+                seen_tokens.update(tokens)
+
         # Always include product type
         if parsed_query.get("product_type"):
-            components.append(parsed_query["product_type"])
-        
+            add_component(parsed_query["product_type"])
+
         # Add primary keywords that significantly narrow the search
         important_keywords = []
         general_keywords = []
-        
+
         for keyword in parsed_query.get("keywords", []):
             # Identify high-value keywords (specific features, specs, etc.)
-            if any(term in keyword.lower() for term in [
-                "gb", "tb", "inch", "hz", "processor", "intel", "amd", "ryzen",
-                "nvidia", "wireless", "bluetooth", "waterproof", "rechargeable"
-            ]):
+            if _IMPORTANT_KEYWORD_RE.search(keyword.lower()):
                 important_keywords.append(keyword)
             else:
                 general_keywords.append(keyword)
-        
+
         # Add important keywords first (up to 2)
         for keyword in important_keywords[:2]:
-            if keyword.lower() not in ' '.join(components).lower():
-                components.append(keyword)
-        
+            add_component(keyword)
+
         # Add general keywords if space allows (up to 1 more)
         for keyword in general_keywords[:1]:
-            if keyword.lower() not in ' '.join(components).lower():
-                components.append(keyword)
-        
+            add_component(keyword)
+
         # Add material if specified
-        if parsed_query.get("material") and parsed_query["material"].lower() not in ' '.join(components).lower():
-            components.append(parsed_query["material"])
-        
+        if parsed_query.get("material"):
+            add_component(parsed_query["material"])
+
         # Construct and log the final search term
         search_term = ' '.join(components)
-        logger.info(f"Constructed search term: '{search_term}'")
+        logger.info("Constructed search term: '%s'", search_term)
         return search_term
     
     def apply_filters_from_query(self, parsed_query: Dict[str, Any]):
         """Apply filters based on parsed query parameters"""
+        applied = False
+
         # Price filter
         if parsed_query.get("price_range"):
             min_price = parsed_query["price_range"].get("min")
             max_price = parsed_query["price_range"].get("max")
             if min_price or max_price:
                 self.amazon_navigator.apply_price_filter(min_price, max_price)
-                logger.info(f"Applied price filter: min={min_price}, max={max_price}")
+                logger.info("Applied price filter: min=%s, max=%s", min_price, max_price)
+                applied = True
         
         # Rating filter
         if parsed_query.get("rating_min"):
             rating_min = parsed_query["rating_min"]
             rating_int = min(4, max(1, int(rating_min)))
             self.amazon_navigator.apply_rating_filter(rating_int)
-            logger.info(f"Applied rating filter: {rating_int}+ stars")
+            logger.info("Applied rating filter: %d+ stars", rating_int)
+            applied = True
         
         # Prime filter
         if parsed_query.get("prime_shipping"):
             self.amazon_navigator.apply_prime_filter()
             logger.info("Applied Prime filter")
+            applied = True
             
-        # Give Amazon's filters time to apply
-        self.browser_manager.random_delay(0.5, 1.5)
\ No newline at end of file
+        # Give Amazon's filters time to apply; skip the wait entirely when
+        # the query carried no filters
+        if applied:
+            self.browser_manager.random_delay(0.5, 1.5)
\ No newline at end of file
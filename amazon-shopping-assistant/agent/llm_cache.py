@@ -0,0 +1,75 @@
+import logging
+import sqlite3
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Disk-backed cache for LLM response strings, keyed by a prompt hash.
+    Entries survive process restarts, so repeated runs against the same
+    products or reviews skip the completion call entirely. Stale entries
+    expire after ttl seconds and are pruned lazily on access.
+    """
+    def __init__(self, path: str = "llm_cache.db", ttl: float = 7 * 86400):
+        self.ttl = ttl
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, content TEXT, expires_at REAL) WITHOUT ROWID"
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to open LLM cache at {path}: {str(e)}")
+            self._conn = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None if missing/expired"""
+        if self._conn is None:
+            return None
+
+        try:
+            row = self._conn.execute(
+                "SELECT content, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"Failed to read LLM cache: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+
+        content, expires_at = row
+        if expires_at < time.time():
+            try:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+            except Exception:
+                pass
+            return None
+
+        return content
+
+    def put(self, key: str, content: str):
+        """Persist a response under key with the configured expiry"""
+        if self._conn is None:
+            return
+
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, content, time.time() + self.ttl)
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to persist LLM cache entry: {str(e)}")
+
+    def close(self):
+        """Close the underlying SQLite connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
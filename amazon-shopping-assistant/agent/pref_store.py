@@ -0,0 +1,91 @@
+import logging
+import sqlite3
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from agent._json import _json_dumps_bytes, _json_loads
+
+logger = logging.getLogger(__name__)
+
+
+def _jsonable(obj):
+    """Serialize the deque-backed interaction window as a plain list"""
+    if isinstance(obj, deque):
+        return list(obj)
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+class PrefStore:
+    """
+    Disk-backed store for per-user preference profiles.
+    Keeps the hottest users in a bounded in-memory LRU cache and
+    persists every profile to SQLite so preferences survive restarts
+    instead of growing an unbounded dict in RAM.
+    """
+    def __init__(self, path: str = "user_prefs.db", cache_size: int = 1000):
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS prefs "
+                "(user_id TEXT PRIMARY KEY, blob BLOB) WITHOUT ROWID"
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to open preference store at {path}: {str(e)}")
+            self._conn = None
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        """Fetch a user's preferences, loading lazily from disk on cache miss"""
+        prefs = self._cache.get(user_id)
+        if prefs is not None:
+            self._cache.move_to_end(user_id)
+            return prefs
+
+        if self._conn is None:
+            return None
+
+        try:
+            row = self._conn.execute(
+                "SELECT blob FROM prefs WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"Failed to load preferences for {user_id}: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+
+        prefs = _json_loads(row[0])
+        self._cache_put(user_id, prefs)
+        return prefs
+
+    def put(self, user_id: str, prefs: Dict):
+        """Write-through: update the cache and persist the profile to disk"""
+        self._cache_put(user_id, prefs)
+
+        if self._conn is None:
+            return
+
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prefs (user_id, blob) VALUES (?, ?)",
+                (user_id, _json_dumps_bytes(prefs, default=_jsonable))
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to persist preferences for {user_id}: {str(e)}")
+
+    def _cache_put(self, user_id: str, prefs: Dict):
+        """Insert into the LRU cache, evicting the coldest user when full"""
+        self._cache[user_id] = prefs
+        self._cache.move_to_end(user_id)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def close(self):
+        """Close the underlying SQLite connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,10 +1,14 @@
 import logging
 import math
 import re
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Bound on memoized recommendation reasons (product, query) pairs
+_REASON_CACHE_MAX = 128
+
 class ProductAnalyzer:
     """
     Analyzes and ranks products based on user preferences and query parameters.
@@ -19,12 +23,46 @@ class ProductAnalyzer:
             "prime": 0.1,       # Prime shipping is preferred
             "relevance": 0.2    # Title relevance to query
         }
+        # Recommendation reasons are pure functions of (product, query);
+        # memoize them so re-ranking the same results (refinements,
+        # follow-ups) skips the string assembly
+        self._reason_cache: OrderedDict = OrderedDict()
     
+    @staticmethod
+    def _build_query_ctx(parsed_query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Precompute the query-derived pieces the per-product scoring loop
+        needs: lowered fields and, per keyword, its lowered form and a
+        compiled whole-word pattern. Built once per ranking call instead
+        of once per product.
+        """
+        keywords = parsed_query.get('keywords', [])
+        return {
+            "product_type": parsed_query.get('product_type', '').lower(),
+            "origin_country": (parsed_query.get('origin_country') or '').lower(),
+            "material": (parsed_query.get('material') or '').lower(),
+            "keywords": [
+                (kw, kw.lower(), re.compile(r'\b' + re.escape(kw.lower()) + r'\b'))
+                for kw in keywords
+            ]
+        }
+
     def rank_products(self, products: List[Dict[str, Any]], parsed_query: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Rank products based on query parameters and apply advanced filtering"""
         try:
             # First apply any advanced filters that weren't handled by Amazon
             filtered_products = self._apply_advanced_filters(products, parsed_query)
+
+            # Query-side string work hoisted out of the product loop
+            ctx = self._build_query_ctx(parsed_query)
+
+            # Fuse the constant factors with their weights once per call;
+            # self.weights stays the tunable source of truth
+            w_rating = 6 * self.weights["rating"]
+            w_reviews = self.weights["reviews"]
+            w_prime = 10 * self.weights["prime"]
+            w_price = self.weights["price"]
+            w_relevance = self.weights["relevance"]
             
             # If no products left after advanced filtering, return the original list
             if not filtered_products and products:
@@ -37,18 +75,18 @@ class ProductAnalyzer:
                 
                 # 1. Rating score (0-30 points based on weight)
                 rating = product.get('rating_value', 0)
-                score += rating * 6 * self.weights["rating"]
+                score += rating * w_rating
                 
                 # 2. Reviews score (log scale, max 20 points)
                 review_count = product.get('review_count', 0)
-                if review_count > 0:
-                    # Log scale to prevent products with thousands of reviews from dominating
-                    review_score = min(20, math.log(review_count + 1) * 2)
-                    score += review_score * self.weights["reviews"]
+                # Log scale to prevent products with thousands of reviews from
+                # dominating; log1p(0) == 0 so no guard is needed
+                review_score = min(20, math.log1p(review_count) * 2)
+                score += review_score * w_reviews
                 
                 # 3. Prime shipping bonus
                 if product.get('has_prime', False) and parsed_query.get('prime_shipping', False):
-                    score += 10 * self.weights["prime"]
+                    score += w_prime
                 
                 # 4. Price factor (inversely proportional, max 20 points)
                 price = product.get('price_value', 0)
@@ -63,18 +101,34 @@ class ProductAnalyzer:
                         # Penalty for being outside the range
                         price_score = 5
                         
-                    score += price_score * self.weights["price"]
+                    score += price_score * w_price
                 
                 # 5. Enhanced title relevance score with advanced matching
                 title = product.get('title', '').lower()
-                relevance_score = self._calculate_relevance_score(title, parsed_query)
-                score += relevance_score * self.weights["relevance"]
+                relevance_score = self._calculate_relevance_score(title, parsed_query, ctx)
+                score += relevance_score * w_relevance
                 
                 # Final score rounded to 2 decimal places
                 product['score'] = round(score, 2)
-            
+
             # Sort by score, descending
             ranked_products = sorted(filtered_products, key=lambda x: x.get('score', 0), reverse=True)
+
+            # Only the top three are ever rendered with a reason, so skip
+            # the explanation work for products below the fold
+            query_key = repr(sorted(parsed_query.items(), key=lambda kv: kv[0]))
+            for product in ranked_products[:3]:
+                cache_key = (product.get('link') or product.get('title', ''), query_key)
+                reason = self._reason_cache.get(cache_key)
+                if reason is None:
+                    reason = self.get_recommendation_reason(
+                        product, parsed_query, product.get('title', '').lower(), ctx)
+                    self._reason_cache[cache_key] = reason
+                    if len(self._reason_cache) > _REASON_CACHE_MAX:
+                        self._reason_cache.popitem(last=False)
+                else:
+                    self._reason_cache.move_to_end(cache_key)
+                product['recommendation_reason'] = reason
             
             logger.info(f"Ranked {len(ranked_products)} products with advanced filtering")
             return ranked_products
@@ -135,29 +189,31 @@ class ProductAnalyzer:
             logger.error(f"Error applying advanced filters: {str(e)}")
             return products
     
-    def _calculate_relevance_score(self, title: str, parsed_query: Dict[str, Any]) -> float:
+    def _calculate_relevance_score(self, title: str, parsed_query: Dict[str, Any],
+                                   ctx: Optional[Dict[str, Any]] = None) -> float:
         """Calculate relevance score based on enhanced title match with query parameters"""
         try:
+            if ctx is None:
+                ctx = self._build_query_ctx(parsed_query)
+
             relevance_score = 0
             max_points = 20
             
             # Match product type
-            product_type = parsed_query.get('product_type', '').lower()
+            product_type = ctx["product_type"]
             if product_type and product_type in title:
                 relevance_score += 5
             
-            # Match keywords with higher precision
-            keywords = parsed_query.get('keywords', [])
+            # Match keywords with higher precision; the lowered form and
+            # whole-word pattern were compiled once for the whole ranking
+            keywords = ctx["keywords"]
             keyword_matches = 0
-            for keyword in keywords:
-                # More precise matching
-                keyword_lower = keyword.lower()
+            for _, keyword_lower, word_boundary_re in keywords:
                 if keyword_lower in title:
                     # Exact match gets more points
                     keyword_matches += 1
                     # Bonus for exact whole word match
-                    word_boundary = r'\b' + re.escape(keyword_lower) + r'\b'
-                    if re.search(word_boundary, title):
+                    if word_boundary_re.search(title):
                         keyword_matches += 0.5
             
             if keywords:
@@ -165,13 +221,11 @@ class ProductAnalyzer:
                 relevance_score += keyword_score
             
             # Match origin country for bonus points
-            origin_country = parsed_query.get('origin_country')
-            if origin_country and origin_country.lower() in title:
+            if ctx["origin_country"] and ctx["origin_country"] in title:
                 relevance_score += 3
             
             # Match material for bonus points
-            material = parsed_query.get('material')
-            if material and material.lower() in title:
+            if ctx["material"] and ctx["material"] in title:
                 relevance_score += 3
             
             # Cap at max points
@@ -181,9 +235,18 @@ class ProductAnalyzer:
             logger.error(f"Error calculating relevance score: {str(e)}")
             return 10  # Middle score as fallback
     
-    def get_recommendation_reason(self, product: Dict[str, Any], parsed_query: Dict[str, Any]) -> str:
+    def get_recommendation_reason(self, product: Dict[str, Any], parsed_query: Dict[str, Any],
+                                  title_lower: Optional[str] = None,
+                                  ctx: Optional[Dict[str, Any]] = None) -> str:
         """Generate an improved explanation for why this product was recommended"""
         try:
+            # Lower the title once; it is checked against origin, material
+            # and every keyword below
+            if title_lower is None:
+                title_lower = product.get('title', '').lower()
+            if ctx is None:
+                ctx = self._build_query_ctx(parsed_query)
+
             reasons = []
             
             # Check rating with exact threshold support
@@ -211,22 +274,18 @@ class ProductAnalyzer:
             
             # Check country of origin
             origin_country = parsed_query.get('origin_country')
-            if origin_country and origin_country.lower() in product.get('title', '').lower():
+            if origin_country and origin_country.lower() in title_lower:
                 reasons.append(f"made in {origin_country}")
             
             # Check material
             material = parsed_query.get('material')
-            if material and material.lower() in product.get('title', '').lower():
+            if material and material.lower() in title_lower:
                 reasons.append(f"{material} material")
             
-            # Check keywords matches
-            keywords = parsed_query.get('keywords', [])
-            matching_keywords = []
-            title = product.get('title', '').lower()
-            
-            for keyword in keywords:
-                if keyword.lower() in title:
-                    matching_keywords.append(keyword)
+            # Check keywords matches, reusing the keywords lowered once in
+            # the ranking context instead of lowering each one per product
+            matching_keywords = [keyword for keyword, keyword_lower, _ in ctx["keywords"]
+                                 if keyword_lower in title_lower]
             
             if matching_keywords:
                 keyword_text = ', '.join(matching_keywords[:2])  # Limit to top 2
@@ -1,14 +1,107 @@
+import hashlib
 import logging
 import re
 import json
+from collections import OrderedDict, deque
 from typing import Dict, List, Any, Optional
-from config.settings import AMAZON_BASE_URL
+from config.settings import AMAZON_BASE_URL, LLM_CACHE_PATH
 from .browser_manager import BrowserManager
-from openai import OpenAI
-from config.settings import OPENAI_API_KEY
+from ._json import _json_loads, _json_dumps
+from .llm_cache import LLMCache
+# Reuse the framework's pooled HTTP/2 OpenAI client so researcher calls
+# share one keep-alive TLS session instead of opening their own pool
+from .agent_framework import _CLIENT as _SHARED_CLIENT
+
+# NumPy turns the semantic-cache similarity scan into one matrix-vector
+# product; pure-Python fallback when not installed
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 logger = logging.getLogger(__name__)
 
+_WS_RE = re.compile(r"\s+")
+
+# Static prompt bodies hoisted to module level so each call only
+# substitutes the dynamic fields instead of rebuilding the full text
+_SYNTHETIC_PROMPT_TEMPLATE = """
+Based on this product information (no actual reviews available), generate a likely review analysis:
+{context}
+
+Suggest likely strengths and concerns based on the product specifications and description.
+
+Return JSON with: 
+- sentiment: string (positive/mixed/negative - if unclear, say "unknown")
+- strengths: array of likely strengths based on specs (3-5 items)
+- concerns: array of likely concerns based on specs (2-3 items)
+- longevity: string (if mentioned in specs, otherwise "unknown")
+- common_themes: array of likely talking points (2-3 items)
+"""
+
+_REVIEW_INSIGHTS_PROMPT_TEMPLATE = """
+Analyze these product reviews in depth and extract:
+1. Overall sentiment (positive/mixed/negative)
+2. Top 5 specific strengths mentioned by multiple reviewers
+3. Top 5 specific concerns or issues mentioned by reviewers
+4. Assessment of product longevity/durability (excellent/good/average/poor/unknown)
+5. Common themes across reviews
+6. Any mentions of customer service quality
+7. Any comparison to competing products
+
+Reviews: {reviews}
+
+Return JSON with: 
+- sentiment: string
+- strengths: array of strings
+- concerns: array of strings
+- longevity: string
+- common_themes: array of strings
+- customer_service: string or null
+- competitor_mentions: array of strings or null
+"""
+
+_PROS_CONS_PROMPT_TEMPLATE = """
+Based on this product data, generate a comprehensive list of pros and cons:
+{context}
+
+Return JSON with:
+- pros: Array of specific advantages (5-7 items)
+- cons: Array of specific disadvantages (3-5 items)
+"""
+
+_COMPARISON_PROMPT_TEMPLATE = """
+Compare these products in depth, considering specifications, price, reviews, and overall value:
+{products}
+
+Return JSON with:
+- best_choice: Object with reason and product_index
+- best_value: Object with reason and product_index
+- feature_comparison: Array of feature objects with name and winner_index
+- reliability_comparison: Assessment of reliability for each product
+- price_analysis: Value assessment considering features and price
+- recommendation: Which type of user would prefer each product
+"""
+
+# Completions cached per researcher instance; identical inputs within a
+# session skip the network round trip entirely
+_LLM_CACHE_MAX = 256
+
+# Semantic cache: paraphrased inputs whose embeddings are this similar
+# reuse the stored response instead of a fresh completion
+_SEM_CACHE_MAX = 512
+_SEM_THRESHOLD = 0.92
+
+# Collect and join matching element texts browser-side in one evaluate
+# call, instead of one inner_text() protocol round trip per element
+_COLLECT_TEXTS_JS = """
+(args) => Array.from(document.querySelectorAll(args.selector))
+    .slice(0, args.limit)
+    .map(e => e.innerText.trim())
+    .join('\\n')
+"""
+
+
 class ProductResearcher:
     """
     V2 enhancement: Performs deep research on individual products
@@ -17,11 +110,108 @@ class ProductResearcher:
     def __init__(self, browser_manager: BrowserManager):
         self.browser_manager = browser_manager
         self.page = None
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.client = _SHARED_CLIENT
+        self._llm_cache: OrderedDict = OrderedDict()
+        self._sem_cache: deque = deque(maxlen=_SEM_CACHE_MAX)
+        self._disk_cache = LLMCache(LLM_CACHE_PATH)
         
     def initialize(self, page):
         """Initialize with browser page"""
         self.page = page
+
+    def _cached_completion(self, cache_key: str, system: str, prompt: str,
+                           temperature: float,
+                           semantic_text: Optional[str] = None) -> str:
+        """
+        Run a chat completion, short-circuiting on a repeated input.
+        The cache is keyed by a hash of the normalized input, so re-analyzing
+        the same reviews or comparing the same products costs a dict lookup
+        instead of a multi-second API call. When semantic_text is given,
+        paraphrased inputs also hit via embedding similarity.
+        """
+        cached = self._llm_cache.get(cache_key)
+        if cached is not None:
+            self._llm_cache.move_to_end(cache_key)
+            return cached
+
+        # Disk layer: warm keys survive restarts, so repeated runs
+        # against the same products skip the completion entirely
+        cached = self._disk_cache.get(cache_key)
+        if cached is not None:
+            self._llm_cache[cache_key] = cached
+            return cached
+
+        vector = None
+        if semantic_text:
+            vector = self._embed(semantic_text)
+            if vector is not None:
+                hit = self._semantic_lookup(vector)
+                if hit is not None:
+                    self._llm_cache[cache_key] = hit
+                    return hit
+
+        response = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "system", "content": system},
+                      {"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            temperature=temperature,
+            # Output length dominates per-call latency; the analysis
+            # JSON shapes all fit well under this cap
+            max_tokens=600
+        )
+        content = response.choices[0].message.content
+
+        self._llm_cache[cache_key] = content
+        if len(self._llm_cache) > _LLM_CACHE_MAX:
+            self._llm_cache.popitem(last=False)
+        if vector is not None:
+            self._sem_cache.append((vector, content))
+        self._disk_cache.put(cache_key, content)
+        return content
+
+    def _embed(self, text: str):
+        """Embed text into a unit vector, or None if the call fails"""
+        try:
+            response = self.client.embeddings.create(
+                model="text-embedding-3-small", input=text[:2000])
+            vector = response.data[0].embedding
+            if np is not None:
+                vector = np.asarray(vector)
+                return vector / np.linalg.norm(vector)
+            norm = sum(v * v for v in vector) ** 0.5
+            return [v / norm for v in vector]
+        except Exception as e:
+            logger.warning(f"Embedding lookup failed: {str(e)}")
+            return None
+
+    def _semantic_lookup(self, vector) -> Optional[str]:
+        """Return the cached response most similar to vector, if close enough"""
+        if not self._sem_cache:
+            return None
+        if np is not None:
+            keys = np.stack([key for key, _ in self._sem_cache])
+            scores = keys @ vector
+            best = int(scores.argmax())
+            if scores[best] >= _SEM_THRESHOLD:
+                logger.info("Semantic cache hit for LLM analysis")
+                return self._sem_cache[best][1]
+            return None
+        best_score, best_content = 0.0, None
+        for key, content in self._sem_cache:
+            score = sum(a * b for a, b in zip(key, vector))
+            if score > best_score:
+                best_score, best_content = score, content
+        if best_score >= _SEM_THRESHOLD:
+            logger.info("Semantic cache hit for LLM analysis")
+            return best_content
+        return None
+
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        """Hash whitespace-normalized, case-folded text into a cache key"""
+        normalized = _WS_RE.sub(" ", text).strip().lower()
+        return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
         
     def research_product(self, product: Dict[str, Any]) -> Dict[str, Any]:
         """Perform comprehensive research on a single product"""
@@ -41,7 +231,10 @@ class ProductResearcher:
                 return result
                 
             self.page.goto(product["link"])
+            # Sleep the settle delay now: the extractions below read the
+            # DOM immediately and nothing else flushes for this page
             self.browser_manager.random_delay()
+            self.browser_manager.flush_delay()
             logger.info(f"Researching product: {product.get('title', 'Unknown')}")
             
             # 1. Extract detailed specifications
@@ -192,20 +385,25 @@ class ProductResearcher:
             # Try to find reviews section first
             review_found = False
             
-            # Navigate to reviews page
-            review_selectors = [
-                "a[data-hook='see-all-reviews-link-foot']",
-                "a.a-link-emphasis[href*='#customerReviews']",
-                "a[href*='#customerReviews']",
+            # Navigate to reviews page: one union locator probe instead
+            # of a visibility poll (each a fresh DOM query) per candidate
+            review_nav_selector = (
+                "a[data-hook='see-all-reviews-link-foot'], "
+                "a.a-link-emphasis[href*='#customerReviews'], "
+                "a[href*='#customerReviews'], "
                 "#acrCustomerReviewLink"
-            ]
-            
-            for selector in review_selectors:
-                if self.page.is_visible(selector):
-                    self.page.click(selector)
-                    self.browser_manager.random_delay()
-                    review_found = True
-                    break
+            )
+            try:
+                nav_link = self.page.locator(review_nav_selector).first
+                nav_link.wait_for(state="attached", timeout=2000)
+                nav_link.click()
+                # The click may navigate to the reviews page; flush so the
+                # extraction below doesn't race the load
+                self.browser_manager.random_delay()
+                self.browser_manager.flush_delay()
+                review_found = True
+            except Exception:
+                logger.debug("No review navigation link found")
             
             # If we can't find a way to reviews section, try to extract review from current page
             if not review_found:
@@ -219,10 +417,10 @@ class ProductResearcher:
             verified_elements = self.page.query_selector_all(".a-color-state:text('Verified Purchase')")
             result["verified_purchases"] = len(verified_elements)
             
-            # Extract review dates
-            date_elements = self.page.query_selector_all("[data-hook='review-date']")
-            review_dates = [e.inner_text() for e in date_elements[:5]]
-            result["recent_reviews"] = review_dates
+            # Extract review dates (one round trip for all of them)
+            dates_text = self.page.evaluate(
+                _COLLECT_TEXTS_JS, {"selector": "[data-hook='review-date']", "limit": 5})
+            result["recent_reviews"] = dates_text.split("\n") if dates_text else []
             
             # Extract review texts with multiple selector approaches
             review_selectors = [
@@ -234,12 +432,14 @@ class ProductResearcher:
             
             reviews_text = ""
             for selector in review_selectors:
-                reviews = self.page.query_selector_all(selector)
-                if reviews and len(reviews) > 0:
-                    reviews_text_list = [r.inner_text() for r in reviews[:10]]
-                    reviews_text = "\n".join(reviews_text_list)
-                    if len(reviews_text) > 200:  # Only accept if we got substantial text
-                        break
+                extracted = self.page.evaluate(
+                    _COLLECT_TEXTS_JS, {"selector": selector, "limit": 10})
+                # Keep short-but-real text from an earlier selector rather
+                # than clobbering it with a later miss
+                if extracted:
+                    reviews_text = extracted
+                if len(reviews_text) > 200:  # Only accept if we got substantial text
+                    break
             
             # Alternative: check if we can directly go to reviews page
             if not reviews_text:
@@ -252,11 +452,13 @@ class ProductResearcher:
                         reviews_url = f"{AMAZON_BASE_URL}/product-reviews/{asin}"
                         self.page.goto(reviews_url)
                         self.browser_manager.random_delay()
+                        self.browser_manager.flush_delay()
                         
                         # Now try to extract reviews again
-                        reviews = self.page.query_selector_all(".a-section.review-text, .a-section.review-text-content")
-                        if reviews:
-                            reviews_text = "\n".join([r.inner_text() for r in reviews[:10]])
+                        reviews_text = self.page.evaluate(
+                            _COLLECT_TEXTS_JS,
+                            {"selector": ".a-section.review-text, .a-section.review-text-content",
+                             "limit": 10})
                 except Exception as e:
                     logger.warning(f"Failed to navigate to direct reviews page: {str(e)}")
             
@@ -320,29 +522,18 @@ class ProductResearcher:
                 "specifications": specs
             }
             
-            prompt = f"""
-            Based on this product information (no actual reviews available), generate a likely review analysis:
-            {json.dumps(context)}
-            
-            Suggest likely strengths and concerns based on the product specifications and description.
-            
-            Return JSON with: 
-            - sentiment: string (positive/mixed/negative - if unclear, say "unknown")
-            - strengths: array of likely strengths based on specs (3-5 items)
-            - concerns: array of likely concerns based on specs (2-3 items)
-            - longevity: string (if mentioned in specs, otherwise "unknown")
-            - common_themes: array of likely talking points (2-3 items)
-            """
+            prompt = _SYNTHETIC_PROMPT_TEMPLATE.format(context=_json_dumps(context))
             
             response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "system", "content": "Expert product analyst"}, 
                         {"role": "user", "content": prompt}],
                 response_format={"type": "json_object"},
-                temperature=0.2
+                temperature=0.2,
+                max_tokens=400
             )
             
-            synthetic_analysis = json.loads(response.choices[0].message.content)
+            synthetic_analysis = _json_loads(response.choices[0].message.content)
             logger.info("Generated synthetic review analysis in absence of reviews")
             return synthetic_analysis
         except Exception as e:
@@ -369,37 +560,17 @@ class ProductResearcher:
                     "common_themes": []
                 }
                 
-            prompt = f"""
-            Analyze these product reviews in depth and extract:
-            1. Overall sentiment (positive/mixed/negative)
-            2. Top 5 specific strengths mentioned by multiple reviewers
-            3. Top 5 specific concerns or issues mentioned by reviewers
-            4. Assessment of product longevity/durability (excellent/good/average/poor/unknown)
-            5. Common themes across reviews
-            6. Any mentions of customer service quality
-            7. Any comparison to competing products
-            
-            Reviews: {reviews_text[:3000]}
-            
-            Return JSON with: 
-            - sentiment: string
-            - strengths: array of strings
-            - concerns: array of strings
-            - longevity: string
-            - common_themes: array of strings
-            - customer_service: string or null
-            - competitor_mentions: array of strings or null
-            """
+            # Key and embed exactly the slice the prompt sees, so review
+            # sets that only diverge later in the text can't collide
+            prompt_reviews = reviews_text[:3000]
+            prompt = _REVIEW_INSIGHTS_PROMPT_TEMPLATE.format(reviews=prompt_reviews)
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": "Expert product review analyst"}, 
-                        {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0
-            )
+            content = self._cached_completion(
+                self._cache_key(prompt_reviews),
+                "Expert product review analyst", prompt, temperature=0,
+                semantic_text=prompt_reviews)
             
-            return json.loads(response.choices[0].message.content)
+            return _json_loads(content)
         except Exception as e:
             logger.error(f"AI review analysis error: {str(e)}")
             return {
@@ -422,24 +593,18 @@ class ProductResearcher:
                 "review_sentiment": reviews.get("sentiment", "unknown")
             }
             
-            prompt = f"""
-            Based on this product data, generate a comprehensive list of pros and cons:
-            {json.dumps(context)}
-            
-            Return JSON with:
-            - pros: Array of specific advantages (5-7 items)
-            - cons: Array of specific disadvantages (3-5 items)
-            """
+            prompt = _PROS_CONS_PROMPT_TEMPLATE.format(context=_json_dumps(context))
             
             response = self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "system", "content": "Expert product analyst"}, 
                           {"role": "user", "content": prompt}],
                 response_format={"type": "json_object"},
-                temperature=0.2
+                temperature=0.2,
+                max_tokens=300
             )
             
-            return json.loads(response.choices[0].message.content)
+            return _json_loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Error generating pros/cons: {str(e)}")
             return {"pros": [], "cons": []}
@@ -467,28 +632,13 @@ class ProductResearcher:
                 })
             
             # Generate AI comparison
-            prompt = f"""
-            Compare these products in depth, considering specifications, price, reviews, and overall value:
-            {json.dumps(product_data)}
-            
-            Return JSON with:
-            - best_choice: Object with reason and product_index
-            - best_value: Object with reason and product_index
-            - feature_comparison: Array of feature objects with name and winner_index
-            - reliability_comparison: Assessment of reliability for each product
-            - price_analysis: Value assessment considering features and price
-            - recommendation: Which type of user would prefer each product
-            """
+            prompt = _COMPARISON_PROMPT_TEMPLATE.format(products=_json_dumps(product_data))
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "system", "content": "Expert product comparison analyst"}, 
-                        {"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.2
-            )
+            content = self._cached_completion(
+                self._cache_key(json.dumps(product_data, sort_keys=True, default=str)),
+                "Expert product comparison analyst", prompt, temperature=0.2)
             
-            comparison_data = json.loads(response.choices[0].message.content)
+            comparison_data = _json_loads(content)
             return comparison_data
             
         except Exception as e:
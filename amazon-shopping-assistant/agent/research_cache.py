@@ -0,0 +1,107 @@
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from ._json import _json_dumps_bytes, _json_loads
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchCache:
+    """
+    Disk-backed cache of product research results, keyed by product link.
+    Research is the most expensive operation in the pipeline (browser
+    navigation plus several LLM calls), so results persist to SQLite and
+    survive restarts; a bounded in-memory LRU keeps the hot entries free.
+    Entries expire after ttl seconds since product pages go stale.
+    """
+    def __init__(self, path: str = "research_cache.db", ttl: float = 86400,
+                 cache_size: int = 64):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS research "
+                "(link TEXT PRIMARY KEY, blob BLOB, stored_at REAL) WITHOUT ROWID"
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to open research cache at {path}: {str(e)}")
+            self._conn = None
+
+    def get(self, link: str) -> Optional[Dict]:
+        """Fetch cached research for a product link, or None"""
+        research = self._cache.get(link)
+        if research is not None:
+            self._cache.move_to_end(link)
+            return research
+
+        if self._conn is None:
+            return None
+
+        try:
+            row = self._conn.execute(
+                "SELECT blob, stored_at FROM research WHERE link = ?", (link,)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"Failed to read research cache: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+
+        blob, stored_at = row
+        if stored_at + self.ttl < time.time():
+            try:
+                self._conn.execute("DELETE FROM research WHERE link = ?", (link,))
+                self._conn.commit()
+            except Exception:
+                pass
+            return None
+
+        research = _json_loads(blob)
+        self._cache_put(link, research)
+        return research
+
+    def __contains__(self, link: str) -> bool:
+        return self.get(link) is not None
+
+    def __getitem__(self, link: str) -> Dict:
+        research = self.get(link)
+        if research is None:
+            raise KeyError(link)
+        return research
+
+    def __setitem__(self, link: str, research: Dict):
+        """Write-through: update the LRU and persist to disk"""
+        self._cache_put(link, research)
+
+        if self._conn is None:
+            return
+
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO research (link, blob, stored_at) "
+                "VALUES (?, ?, ?)",
+                (link, _json_dumps_bytes(research), time.time())
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.error(f"Failed to persist research for {link}: {str(e)}")
+
+    def _cache_put(self, link: str, research: Dict):
+        """Insert into the LRU, evicting the coldest entry when full"""
+        self._cache[link] = research
+        self._cache.move_to_end(link)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def close(self):
+        """Close the underlying SQLite connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -7,6 +7,8 @@ load_dotenv()
 # Browser settings
 USER_AGENT = os.getenv("USER_AGENT", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
 HEADLESS = os.getenv("HEADLESS", "False").lower() == "true"
+# Per-character typing in the search box; slow, so off by default
+STEALTH_TYPING = os.getenv("STEALTH_TYPING", "False").lower() == "true"
 
 # Rate limiting
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", 3))
@@ -19,5 +21,11 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # Amazon specific
 AMAZON_BASE_URL = "https://www.amazon.com"
 
+# Persistence
+PREFS_DB_PATH = os.getenv("PREFS_DB_PATH", "user_prefs.db")
+STORAGE_STATE_PATH = os.getenv("STORAGE_STATE_PATH", "amz_state.json")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+RESEARCH_CACHE_PATH = os.getenv("RESEARCH_CACHE_PATH", "research_cache.db")
+
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
\ No newline at end of file